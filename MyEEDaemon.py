@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# The daemon runs until it is stopped.
+import argparse
+import signal
+import threading
+import time
+
+# The status is served over HTTP on the local machine.
+try:
+    # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+# This script makes heavy use of JSON parsing.
+import json
+
+# All the shared functions are in this package.
+from shared.datagift import giftLargestAmount
+from shared.historystore import HistoryStore
+from shared.instrumentation import Instrumentation, PrometheusExporter
+from shared.scheduler import Scheduler
+from shared.sessioncache import SessionCache
+from shared.transport import Transport
+from shared.warmsession import WarmSession
+
+# The jobs run when "MyEE_DaemonJobs" is not in credentials.json (a data gift at midnight on the 23rd as in the suggested crontab and a usage poll every half an hour).
+defaultJobs = [
+    {'Name':'dataGift', 'Type':'dataGift', 'Schedule':'0 0 23 * *', 'JitterSeconds':600},
+    {'Name':'dataUsage', 'Type':'dataUsage', 'Schedule':'*/30 * * * *', 'JitterSeconds':60}
+]
+
+def log(message):
+    print(time.strftime('%Y-%m-%d %H:%M:%S') + ' ' + message, flush=True)
+
+def createJob(jobSettings, credentials, warmSession, historyStore):
+    # The donor and recipient MSISDNs default to those in credentials.json.
+    donorMSISDN = jobSettings.get('DonorMSISDN', credentials['MyEE_DonorMSISDN'])
+    recipientMSISDN = jobSettings.get('RecipientMSISDN', credentials.get('MyEE_RecipientMSISDN'))
+
+    def dataGift():
+        # The same as MyEEDataGift.py but with the already logged in session.
+        with warmSession.use() as myEE:
+            result = giftLargestAmount(credentials['MyEE_Username'], None, donorMSISDN, recipientMSISDN, myEE=myEE)
+            log('* ' + jobSettings['Name'] + ': ' + result['status'] + (' ' + result['giftingDisplayString'] if result['status'] == 'gifted' else '') + '.')
+
+            # giftLargestAmount() reports every exception in its result, so a failure is raised here (where an expired session is noticed and logged in again).
+            if result['status'] == 'failed': raise ValueError(result.get('error', 'Data gifting failed.'))
+
+        return {'status':result['status'], 'giftingAmountInMB':result['giftingAmountInMB']}
+
+    def dataUsage():
+        # The same as MyEEDataUsage.py but with the already logged in session.
+        with warmSession.use() as myEE:
+            if not myEE.switchMSISDN(donorMSISDN):
+                raise ValueError('Failed to switch to MSISDN ' + str(donorMSISDN) + '.')
+
+            records = myEE.extractRecords(myEE.dataPassHistory())
+
+        log('* ' + jobSettings['Name'] + ': ' + str(len(records)) + ' data pass(es).')
+        return {'dataPasses':len(records)}
+
+    def historySync():
+        # The same as MyEEHistorySync.py but with the already logged in session.
+        with warmSession.use() as myEE:
+            newRecords = historyStore.sync(myEE, donorMSISDN)
+
+        log('* ' + jobSettings['Name'] + ': ' + str(sum(newRecords.values())) + ' new record(s).')
+        return newRecords
+
+    jobTypes = {'dataGift':dataGift, 'dataUsage':dataUsage, 'historySync':historySync}
+    if jobSettings['Type'] not in jobTypes:
+        raise ValueError('Unknown job type "' + jobSettings['Type'] + '" (expected one of ' + ', '.join(sorted(jobTypes)) + ').')
+
+    return jobTypes[jobSettings['Type']]
+
+def createStatusServer(host, port, warmSession, scheduler, instrumentation, transport):
+
+    class StatusRequestHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path == '/health':
+                # Healthy once logged in (and for as long as the keep-alives succeed).
+                healthy = warmSession.myEE is not None and all(job['lastError'] is None for job in scheduler.status() if job['name'] == 'keepAlive')
+                self.respond(200 if healthy else 503, 'application/json', json.dumps({'healthy':healthy}))
+            elif self.path == '/status':
+                self.respond(200, 'application/json', json.dumps({'session':warmSession.status(), 'jobs':scheduler.status(), 'transport':{'statistics':dict(transport.statistics), 'hosts':transport.status()}}, indent=4, default=str))
+            elif self.path == '/metrics':
+                self.respond(200, 'text/plain; version=0.0.4', PrometheusExporter(instrumentation).render())
+            else:
+                self.respond(404, 'application/json', json.dumps({'error':'Not found.'}))
+
+        def respond(self, status, contentType, body):
+            body = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', contentType)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Status requests are not worth logging.
+            pass
+
+    return HTTPServer((host, port), StatusRequestHandler)
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep a My EE session logged in and run scheduled jobs with it.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address the status server listens on (default: 127.0.0.1).')
+    parser.add_argument('--port', type=int, default=8472, help='Port the status server listens on, 0 to disable (default: 8472).')
+    parser.add_argument('--keep-alive', default='*/10 * * * *', help='Cron schedule for the session keep-alives (default: every 10 minutes).')
+    parser.add_argument('--max-session-age', type=int, default=3600, help='Seconds before the session is renewed (default: 3600).')
+    args = parser.parse_args()
+
+    # Load credentials.
+    with open('credentials.json', 'r') as in_file:
+        credentials = json.load(in_file)
+
+    # (Optional) Re-use a previously cached session rather than logging in every time.
+    sessionCache = SessionCache(credentials['MyEE_SessionCacheDirectory']) if credentials.get('MyEE_SessionCacheDirectory') else None
+
+    # (Optional) The history sync job needs the local history store.
+    jobs = credentials.get('MyEE_DaemonJobs', defaultJobs)
+    historyStore = HistoryStore(credentials.get('MyEE_HistoryDatabase', 'history.sqlite')) if any(job['Type'] == 'historySync' for job in jobs) else None
+
+    # Every request is recorded so the status server can export them as metrics (and transient failures are retried).
+    instrumentation = Instrumentation()
+    transport = Transport()
+    warmSession = WarmSession(credentials['MyEE_Username'], credentials['MyEE_Password'], sessionCache, instrumentation=instrumentation, transport=transport, maxSessionAge=args.max_session_age)
+
+    log('* Logging into My EE.')
+    warmSession.login()
+
+    # The keep-alives are scheduled like any other job.
+    scheduler = Scheduler()
+    scheduler.addJob('keepAlive', args.keep_alive, warmSession.keepAlive)
+    for job in jobs:
+        scheduler.addJob(job['Name'], job['Schedule'], createJob(job, credentials, warmSession, historyStore), job.get('JitterSeconds', 0))
+        log('* Scheduled ' + job['Name'] + ' (' + job['Type'] + ') for "' + job['Schedule'] + '".')
+
+    # (Optional) Serve the health, status and metrics on the local machine.
+    if args.port:
+        statusServer = createStatusServer(args.host, args.port, warmSession, scheduler, instrumentation, transport)
+        statusThread = threading.Thread(target=statusServer.serve_forever, name='StatusServer')
+        statusThread.daemon = True
+        statusThread.start()
+        log('* Status available at http://' + args.host + ':' + str(statusServer.server_address[1]) + '/status.')
+
+    # Stop cleanly (after any running job) when asked to.
+    signal.signal(signal.SIGTERM, lambda signalNumber, frame: scheduler.stop())
+
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+
+    log('* Stopping.')
+    if historyStore: historyStore.close()
+
+if __name__ == '__main__':
+    main()
@@ -20,7 +20,9 @@
 from __future__ import print_function
 
 # All the shared functions are in this package.
+from shared.datagift import largestGiftingAmount
 from shared.myee import MyEE
+from shared.sessioncache import SessionCache
 
 # This script makes heavy use of JSON parsing.
 import json
@@ -29,46 +31,33 @@ import json
 with open('credentials.json', 'r') as in_file:
     credentials = json.load(in_file)
 
+# (Optional) Re-use a previously cached session rather than logging in every time.
+sessionCache = SessionCache(credentials['MyEE_SessionCacheDirectory']) if credentials.get('MyEE_SessionCacheDirectory') else None
+
 # Create a My EE object.
 print('* Logging into My EE.')
-myEE = MyEE(credentials['MyEE_Username'], credentials['MyEE_Password'])
-
-# Authenticate with the data gifting page.
-print('* Getting data gifting token.')
-csrf = myEE.familyGiftingAuth()
+myEE = MyEE(credentials['MyEE_Username'], credentials['MyEE_Password'], sessionCache)
 
-# Get the data gifting allowance.
+# Get the data gifting allowance (the data gifting token is fetched and then re-used by My EE automatically).
 print('* Checking data gifting allowances:')
-allowances = myEE.familyGiftingSubscriptionDataAllowance(csrf)
+allowances = myEE.familyGiftingSubscriptionDataAllowance()
 
-# Work out how much data can be gifted.
-for subscription in allowances:
-    # We are only interested in the donor MSISDN.
-    if subscription['msisdn'] != credentials['MyEE_DonorMSISDN']: continue
+# Work out the largest amount of data that can be gifted.
+donorSubscription, giftingAmountInMB, giftingDisplayString = largestGiftingAmount(allowances, credentials['MyEE_DonorMSISDN'])
 
-    # Print out the limits.
-    allowancePrefixText = '  - Can gift up to ' + subscription['amountRemaining']  + ' ' + subscription['amountRemainingUnits'] + ' out of '
-    if subscription['isUnlimited']:
-        print(allowancePrefixText + 'the 100/120 GB gifting allowance after ' + subscription['amountUsed'] + ' ' + subscription['amountUsedUnits'] + ' data usage.')
+# Print out the limits.
+if donorSubscription:
+    allowancePrefixText = '  - Can gift up to ' + donorSubscription['amountRemaining']  + ' ' + donorSubscription['amountRemainingUnits'] + ' out of '
+    if donorSubscription['isUnlimited']:
+        print(allowancePrefixText + 'the 100/120 GB gifting allowance after ' + donorSubscription['amountUsed'] + ' ' + donorSubscription['amountUsedUnits'] + ' data usage.')
     else:
-        print(allowancePrefixText + subscription['totalVolume'] + ' ' + subscription['totalVolumeUnits'] + '.')
-
-    # Variables used to work out the maximum amount allowed to data gift.
-    giftingAmountInMB = 0
-    giftingDisplayString = ''
-
-    # Take each amount that can be gifted and work out the maximum amount allowed to data gift.
-    for allowedDataTransferAmount in subscription['allowedDataTransferAmounts']:
-        # Is this the largest allowable data gifting amount so far?
-        if allowedDataTransferAmount['giftingAmountInMB'] > giftingAmountInMB:
-            giftingAmountInMB = allowedDataTransferAmount['giftingAmountInMB']
-            giftingDisplayString = allowedDataTransferAmount['giftingDisplayAmount'] + ' ' + allowedDataTransferAmount['giftingDisplayUnits']
+        print(allowancePrefixText + donorSubscription['totalVolume'] + ' ' + donorSubscription['totalVolumeUnits'] + '.')
 
 # (Optional) Get the history of the family gifting.
 print('* Downloaded data gifting history:')
-print(json.dumps(myEE.familyGiftingHistory(csrf), indent=4))
+print(json.dumps(myEE.familyGiftingHistory(), indent=4))
 
 # Perform the data gifting.
 if giftingAmountInMB > 0:
     print('* Performing data gifting of ' + giftingDisplayString + '.')
-    myEE.familyGifting(giftingAmountInMB, credentials['MyEE_DonorMSISDN'], credentials['MyEE_RecipientMSISDN'], csrf)
\ No newline at end of file
+    myEE.familyGifting(giftingAmountInMB, credentials['MyEE_DonorMSISDN'], credentials['MyEE_RecipientMSISDN'])
\ No newline at end of file
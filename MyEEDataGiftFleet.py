@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# The accounts are processed in a pool of worker threads (or processes).
+import argparse
+import concurrent.futures
+import time
+
+# This script makes heavy use of JSON parsing.
+import json
+
+# All the shared functions are in this package.
+from shared.datagift import giftLargestAmount
+from shared.ratelimit import RateLimiter
+from shared.sessioncache import SessionCache
+from shared.transport import Transport
+
+# Each worker process has its own transport (with its rate limiter) and session cache (they cannot be shared between processes).
+workerTransport = None
+workerSessionCache = None
+
+def initialiseWorker(rate, burst, retries, sessionCacheDirectory):
+    global workerTransport, workerSessionCache
+    workerTransport = Transport(RateLimiter(rate, burst) if rate else None, maxRetries=retries)
+    workerSessionCache = SessionCache(sessionCacheDirectory) if sessionCacheDirectory else None
+
+def giftAccount(account):
+    # Run the whole login and data gifting pipeline for a single account.
+    return giftLargestAmount(account['MyEE_Username'], account['MyEE_Password'], account['MyEE_DonorMSISDN'], account['MyEE_RecipientMSISDN'], workerSessionCache, transport=workerTransport)
+
+def main():
+    parser = argparse.ArgumentParser(description='Gift data for many My EE accounts at once.')
+    parser.add_argument('fleet', nargs='?', default='fleet.json', help='JSON file listing the accounts (default: fleet.json).')
+    parser.add_argument('--workers', type=int, default=8, help='How many accounts to process at once (default: 8).')
+    parser.add_argument('--processes', action='store_true', help='Use a pool of processes rather than threads.')
+    parser.add_argument('--rate', type=float, default=5, help='Maximum requests per second to each EE host, 0 for unlimited (default: 5).')
+    parser.add_argument('--burst', type=int, default=5, help='Maximum burst of requests to each EE host (default: 5).')
+    parser.add_argument('--retries', type=int, default=3, help='How many times a throttled or failed request is retried (default: 3).')
+    parser.add_argument('--report', help='Also write the summary report as JSON to this file.')
+    args = parser.parse_args()
+
+    # Load the list of accounts (and their donor and recipient MSISDNs).
+    with open(args.fleet, 'r') as in_file:
+        fleet = json.load(in_file)
+
+    # Process pools do not share memory so each process gets an equal share of the rate limit.
+    rate = args.rate
+    if args.processes and rate:
+        rate = rate / args.workers
+
+    if args.processes:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=args.workers, initializer=initialiseWorker, initargs=(rate, args.burst, args.retries, fleet.get('MyEE_SessionCacheDirectory')))
+    else:
+        # Threads all share the one transport and session cache.
+        initialiseWorker(rate, args.burst, args.retries, fleet.get('MyEE_SessionCacheDirectory'))
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=args.workers)
+
+    print('* Gifting data for ' + str(len(fleet['Accounts'])) + ' account(s) with ' + str(args.workers) + ' worker(s).')
+    startTime = time.perf_counter()
+
+    # Print each account's outcome as soon as it finishes.
+    results = []
+    with executor:
+        for future in concurrent.futures.as_completed([executor.submit(giftAccount, account) for account in fleet['Accounts']]):
+            result = future.result()
+            results.append(result)
+
+            outcome = result['status'] + (' ' + result['giftingDisplayString'] if result['status'] == 'gifted' else '')
+            if 'error' in result: outcome += ' (' + result['error'] + ')'
+            print('  - ' + result['username'] + ': ' + outcome + ' in ' + str(result['timings']['total']) + 's.')
+
+    # Summarise the whole run.
+    elapsed = round(time.perf_counter() - startTime, 3)
+    summary = {'accounts':len(results), 'elapsed':elapsed, 'outcomes':{}}
+    for result in results:
+        summary['outcomes'][result['status']] = summary['outcomes'].get(result['status'], 0) + 1
+
+    print('* Finished in ' + str(elapsed) + 's: ' + ', '.join(str(count) + ' ' + status for status, count in sorted(summary['outcomes'].items())) + '.')
+
+    # The threads all shared the one transport so we can see how often EE had to be retried.
+    if not args.processes:
+        summary['transport'] = dict(workerTransport.statistics)
+        print('* ' + str(summary['transport']['retries']) + ' retried request(s), ' + str(summary['transport']['loginRestarts']) + ' restarted login(s).')
+
+    # (Optional) Save the full report.
+    if args.report:
+        summary['results'] = sorted(results, key=lambda result: result['username'])
+        with open(args.report, 'w') as out_file:
+            json.dump(summary, out_file, indent=4)
+
+if __name__ == '__main__':
+    main()
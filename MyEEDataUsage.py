@@ -21,6 +21,7 @@ from __future__ import print_function
 
 # All the shared functions are in this package.
 from shared.myee import MyEE
+from shared.sessioncache import SessionCache
 
 # This script makes heavy use of JSON parsing.
 import json
@@ -29,9 +30,12 @@ import json
 with open('credentials.json', 'r') as in_file:
     credentials = json.load(in_file)
 
+# (Optional) Re-use a previously cached session rather than logging in every time.
+sessionCache = SessionCache(credentials['MyEE_SessionCacheDirectory']) if credentials.get('MyEE_SessionCacheDirectory') else None
+
 # Create a My EE object.
 print('* Logging into My EE.')
-myEE = MyEE(credentials['MyEE_Username'], credentials['MyEE_Password'])
+myEE = MyEE(credentials['MyEE_Username'], credentials['MyEE_Password'], sessionCache)
 
 # Switching to my SIM.
 print('* Switching SIMs.')
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# All the shared functions are in this package.
+from shared.historystore import HistoryStore
+from shared.myee import MyEE
+from shared.sessioncache import SessionCache
+
+# This script makes heavy use of JSON parsing.
+import json
+
+# Load credentials.
+with open('credentials.json', 'r') as in_file:
+    credentials = json.load(in_file)
+
+# (Optional) Re-use a previously cached session rather than logging in every time.
+sessionCache = SessionCache(credentials['MyEE_SessionCacheDirectory']) if credentials.get('MyEE_SessionCacheDirectory') else None
+
+# Open the local history store.
+historyStore = HistoryStore(credentials.get('MyEE_HistoryDatabase', 'history.sqlite'))
+
+# Create a My EE object.
+print('* Logging into My EE.')
+myEE = MyEE(credentials['MyEE_Username'], credentials['MyEE_Password'], sessionCache)
+
+# Only new records are added to the store.
+for msisdn in credentials.get('MyEE_HistoryMSISDNs', [credentials['MyEE_DonorMSISDN']]):
+    print('* Synchronising history for ' + msisdn + ':')
+    for history, newRecords in sorted(historyStore.sync(myEE, msisdn).items()):
+        print('  - ' + history + ': ' + str(newRecords) + ' new record(s).')
+
+    # Summarise the data passes by month (from the local store, without asking EE).
+    print('* Data passes by month for ' + msisdn + ':')
+    for period in historyStore.aggregate(credentials['MyEE_Username'], msisdn, 'dataPassHistory'):
+        print('  - ' + str(period['period']) + ': ' + str(period['count']) + '.')
+
+historyStore.close()
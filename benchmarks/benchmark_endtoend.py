@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# The flows are also run concurrently to measure throughput.
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+# Results can be saved and compared between runs.
+import json
+
+# Allow this script to be run from the benchmarks folder or the repository root.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# The local stand-in for the EE servers.
+from mockserver import MockEEServer, useMockServer
+
+# All the shared functions are in this package.
+from shared.datagift import largestGiftingAmount
+from shared.myee import MyEE
+from shared.transport import ThrottledError, Transport
+
+# (Optional) The flows can all share a transport (to measure the cost of retries when the server is failing).
+transport = None
+
+def loginFlow(mockServer):
+    MyEE('benchmark@example.com', 'password', transport=transport)
+
+def dataGiftFlow(mockServer):
+    # The same requests as MyEEDataGift.py.
+    myEE = MyEE('benchmark@example.com', 'password', transport=transport)
+    allowances = myEE.familyGiftingSubscriptionDataAllowance()
+    _, giftingAmountInMB, _ = largestGiftingAmount(allowances, mockServer.lines[0])
+    myEE.familyGiftingHistory()
+    if giftingAmountInMB > 0:
+        myEE.familyGifting(giftingAmountInMB, mockServer.lines[0], mockServer.lines[-1])
+
+def dataUsageFlow(mockServer):
+    # The same requests as MyEEDataUsage.py.
+    myEE = MyEE('benchmark@example.com', 'password', transport=transport)
+    myEE.switchMSISDN(mockServer.lines[0])
+    myEE.dataPassHistory()
+
+def runFlow(flow, mockServer):
+    # A POST the server failed is not sent again so (even with a transport) its flow fails rather than the benchmark.
+    try:
+        flow(mockServer)
+        return True
+    except ThrottledError:
+        return False
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def measure(mockServer, flow, iterations, workers):
+    # Each flow is first run one at a time for its latency.
+    latencies = []
+    failures = 0
+    mockServer.resetStatistics()
+    for _ in range(iterations):
+        # Every flow starts with the same data gifting allowance.
+        mockServer.giftingRemainingMB = dict((line, 20480) for line in mockServer.lines)
+
+        startTime = time.perf_counter()
+        if not runFlow(flow, mockServer): failures += 1
+        latencies.append(time.perf_counter() - startTime)
+
+    statistics = mockServer.snapshotStatistics()
+
+    # Then many at once for the throughput.
+    startTime = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(runFlow, flow, mockServer) for _ in range(iterations)]:
+            if not future.result(): failures += 1
+    elapsed = time.perf_counter() - startTime
+
+    return {
+        'meanMs': round(1000 * sum(latencies) / len(latencies), 2),
+        'p50Ms': round(1000 * percentile(latencies, 0.5), 2),
+        'p95Ms': round(1000 * percentile(latencies, 0.95), 2),
+        'roundTrips': statistics['requests'] / float(iterations),
+        'bytesSent': statistics['bytesReceived'] // iterations,
+        'bytesReceived': statistics['bytesSent'] // iterations,
+        'throughputPerSecond': round(iterations / elapsed, 2),
+        'failedFlows': failures
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the My EE login and flows against a local mock EE server.')
+    parser.add_argument('--iterations', type=int, default=20, help='How many times each flow is run (default: 20).')
+    parser.add_argument('--workers', type=int, default=8, help='How many flows are run at once for the throughput (default: 8).')
+    parser.add_argument('--latency', type=float, default=0.005, help='Seconds the mock server delays every response by (default: 0.005).')
+    parser.add_argument('--records', type=int, default=50, help='How many records the history end-points return (default: 50).')
+    parser.add_argument('--padding', type=int, default=0, help='Extra characters added to every record (default: 0).')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests the mock server throttles or fails (default: 0).')
+    parser.add_argument('--transport', action='store_true', help='Send the requests through a transport that retries them.')
+    parser.add_argument('--output', help='Save the results as JSON to this file.')
+    parser.add_argument('--compare', help='Compare the results with those previously saved to this file.')
+    args = parser.parse_args()
+
+    global transport
+    if args.transport: transport = Transport(backoffBase=0.01)
+
+    # Start the mock server and point the client at it.
+    mockServer = MockEEServer(latency=args.latency, records=args.records, padding=args.padding, errorRate=args.error_rate).start()
+    useMockServer(MyEE, mockServer)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, 'r') as in_file:
+            previous = json.load(in_file)['results']
+
+    print('* Benchmarking ' + str(args.iterations) + ' iterations (' + str(args.workers) + ' workers, ' + str(args.latency * 1000) + ' ms latency, ' + str(args.records) + ' records).')
+    print('  {0:<10} {1:>9} {2:>9} {3:>9} {4:>7} {5:>9} {6:>9} {7:>10} {8:>7}'.format('Flow', 'Mean ms', 'p50 ms', 'p95 ms', 'Trips', 'Sent B', 'Recv B', 'Flows/s', 'Failed'))
+
+    results = {}
+    for name, flow in (('login', loginFlow), ('dataGift', dataGiftFlow), ('dataUsage', dataUsageFlow)):
+        result = results[name] = measure(mockServer, flow, args.iterations, args.workers)
+        print('  {0:<10} {1:>9} {2:>9} {3:>9} {4:>7} {5:>9} {6:>9} {7:>10} {8:>7}'.format(name, result['meanMs'], result['p50Ms'], result['p95Ms'], result['roundTrips'], result['bytesSent'], result['bytesReceived'], result['throughputPerSecond'], result['failedFlows']))
+
+        # Show how each measurement changed since the previous run.
+        if name in previous:
+            changes = []
+            for key, value in sorted(result.items()):
+                if previous[name].get(key):
+                    changes.append(key + ' ' + '{0:+.1f}%'.format(100.0 * (value - previous[name][key]) / previous[name][key]))
+            print('    (' + ', '.join(changes) + ')')
+
+    mockServer.stop()
+
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            json.dump({'settings':vars(args), 'results':results}, out_file, indent=4)
+
+if __name__ == '__main__':
+    main()
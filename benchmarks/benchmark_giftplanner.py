@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# The families are generated at random (but the same every run).
+import argparse
+import os
+import random
+import sys
+import time
+
+# Allow this script to be run from the benchmarks folder or the repository root.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# All the shared functions are in this package.
+from shared.giftplanner import planGifts
+
+# The amounts (in MB) EE allows to be gifted at once.
+giftingAmountsInMB = (250, 500, 1024, 2048, 5120, 10240)
+
+def family(donors, recipients, seed):
+    # Donors with between 1 GB and 30 GB left and recipients wanting up to 15 GB each.
+    generator = random.Random(seed)
+    allowances = []
+
+    for index in range(donors):
+        remainingMB = generator.randint(1024, 30720)
+        allowances.append({'msisdn':'4470' + str(index).zfill(8), 'amountRemaining':str(remainingMB), 'amountRemainingUnits':'MB', 'allowedDataTransferAmounts':[{'giftingAmountInMB':amount} for amount in giftingAmountsInMB if amount <= remainingMB]})
+
+    targets = dict(('4479' + str(index).zfill(8), generator.randint(250, 15360)) for index in range(recipients))
+    return allowances, targets
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the multi-donor data gifting planner.')
+    parser.add_argument('--iterations', type=int, default=5, help='How many times each family is planned (default: 5).')
+    args = parser.parse_args()
+
+    print('* Benchmarking ' + str(args.iterations) + ' iterations.')
+    print('  {0:>7} {1:>10} {2:>9} {3:>7} {4:>10} {5:>12}'.format('Donors', 'Recipients', 'Mean ms', 'Gifts', 'Gifts/rec', 'Shortfall MB'))
+
+    for donors, recipients in ((2, 2), (5, 10), (20, 50), (100, 250), (500, 1000)):
+        allowances, targets = family(donors, recipients, donors * recipients)
+
+        startTime = time.perf_counter()
+        for _ in range(args.iterations):
+            giftPlan = planGifts(allowances, targets)
+        elapsed = (time.perf_counter() - startTime) / args.iterations
+
+        shortfallMB = sum(recipient['shortfallMB'] for recipient in giftPlan['recipients'].values())
+        print('  {0:>7} {1:>10} {2:>9} {3:>7} {4:>10} {5:>12}'.format(donors, recipients, round(1000 * elapsed, 2), len(giftPlan['gifts']), round(len(giftPlan['gifts']) / float(recipients), 2), shortfallMB))
+
+if __name__ == '__main__':
+    main()
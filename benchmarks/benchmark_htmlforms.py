@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# We measure both the time taken and the peak memory used.
+import os
+import sys
+import timeit
+import tracemalloc
+
+# Allow this script to be run from the benchmarks folder or the repository root.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# The extractor being benchmarked.
+from shared.htmlforms import extractForm
+
+# Third party library to parse (X)HTML; "pip install beautifulsoup4" if getting import errors.
+from bs4 import BeautifulSoup
+
+def apiGatewayPage():
+    # The small auto-submitting page Azure AD B2C returns to log into the API Gateway.
+    return ('<!DOCTYPE html><html><head><title>Working...</title></head><body>'
+            '<form method="POST" name="hiddenform" action="https://api.ee.co.uk/authorize/callback">'
+            '<input type="hidden" name="state" id="state" value="StateValue&amp;1234" />'
+            '<input type="hidden" name="code" id="code" value="eyJraWQiOiJjcGltY29yZV8wOTI1MjAxNSIsInZlciI6IjEuMCJ9" />'
+            '<noscript><p>Script is disabled. Click Submit to continue.</p><input type="submit" value="Submit" /></noscript>'
+            '</form><script language="javascript">document.forms[0].submit();</script></body></html>')
+
+def dataGiftingPage(sections=400):
+    # A large page similar to the data gifting page (navigation, several forms and a lot of markup after the one we want).
+    filler = ['<div class="section" id="section-' + str(index) + '"><h2>Section ' + str(index) + '</h2><p>Lorem ipsum <a href="/link/' + str(index) + '">link</a> dolor sit amet.</p>'
+              '<ul>' + ''.join('<li data-index="' + str(item) + '">Item ' + str(item) + '</li>' for item in range(10)) + '</ul></div>' for index in range(sections)]
+
+    return ('<!DOCTYPE html><html><head><title>Data gifting</title></head><body>'
+            '<form action="/search" method="get"><input type="text" id="q" name="q" /><input type="hidden" id="csrf" name="csrf" value="WrongToken" /></form>'
+            + ''.join(filler[:sections // 4]) +
+            '<form action="/app/family-gifting?fa=giftData" method="post">'
+            '<input type="hidden" name="csrf" id="csrf" value="CsrfToken&amp;5678">'
+            '<select name="dataTransferMB"><option value="500">500 MB</option><option value="1024">1 GB</option></select>'
+            '<button type="submit">Gift data</button></form>'
+            + ''.join(filler[sections // 4:]) + '</body></html>')
+
+def beautifulSoupAPIGateway(content):
+    # The previous implementation of MyEE.loginToAPIGateway().
+    soup = BeautifulSoup(content, 'html.parser')
+    form = soup.find('form')
+    return form.attrs.get('action'), form.find('input', {'id': 'state'}).get('value'), form.find('input', {'id': 'code'}).get('value')
+
+def extractorAPIGateway(content):
+    actionURL, values = extractForm(content, ids=('state', 'code'))
+    return actionURL, values['state'], values['code']
+
+def beautifulSoupDataGifting(content):
+    # The previous implementation of MyEE.familyGiftingAuth().
+    soup = BeautifulSoup(content, 'html.parser')
+    return soup.find('form', {'action': '/app/family-gifting?fa=giftData'}).find(id='csrf').attrs['value']
+
+def extractorDataGifting(content):
+    return extractForm(content, action='/app/family-gifting?fa=giftData', ids=('csrf',))[1]['csrf']
+
+def peakMemory(function, content):
+    # The peak memory (in KiB) allocated while running the function once.
+    tracemalloc.start()
+    function(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024.0
+
+def benchmark(name, content, beautifulSoupFunction, extractorFunction, number):
+    # Both implementations have to agree before their speed means anything.
+    expected = beautifulSoupFunction(content)
+    actual = extractorFunction(content)
+    if expected != actual:
+        raise AssertionError(name + ': extractor returned ' + repr(actual) + ' but BeautifulSoup returned ' + repr(expected) + '.')
+
+    print('* ' + name + ' (' + str(len(content)) + ' characters, ' + str(number) + ' runs):')
+    for label, function in (('BeautifulSoup', beautifulSoupFunction), ('Extractor', extractorFunction)):
+        seconds = min(timeit.repeat(lambda: function(content), number=number, repeat=3)) / number
+        print('  - {0:<14} {1:10.3f} ms/run {2:10.1f} KiB peak'.format(label, seconds * 1000, peakMemory(function, content)))
+
+if __name__ == '__main__':
+    benchmark('API Gateway login form', apiGatewayPage(), beautifulSoupAPIGateway, extractorAPIGateway, 2000)
+    benchmark('Data gifting page', dataGiftingPage(), beautifulSoupDataGifting, extractorDataGifting, 20)
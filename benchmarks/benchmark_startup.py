@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# Every measurement starts a fresh interpreter.
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Results can be saved and compared between runs.
+import json
+
+# The repository root (so "shared" can be imported).
+repositoryRoot = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# The cold starts that are measured (the first is the interpreter on its own for comparison).
+scenarios = (
+    ('interpreter', ['-c', 'pass']),
+    ('import shared.myee', ['-c', 'import shared.myee']),
+    ('import shared.cli', ['-c', 'import shared.cli']),
+    ('python -m shared --help', ['-m', 'shared', '--help']),
+    ('import requests', ['-c', 'import requests'])
+)
+
+# Modules that should only be imported when a code path needs them.
+heavyModules = ('requests', 'urllib3', 'http.cookiejar', 'html.parser', 'concurrent.futures', 'bs4')
+
+def run(arguments, importTime=False):
+    # Runs a fresh interpreter (returning how long it took and what it printed to stderr).
+    command = [sys.executable] + (['-X', 'importtime'] if importTime else []) + arguments
+    startTime = time.perf_counter()
+    process = subprocess.run(command, cwd=repositoryRoot, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    return time.perf_counter() - startTime, process.stderr
+
+def parseImportTime(output):
+    # Each "-X importtime" line is "import time: self [us] | cumulative | imported package".
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line: continue
+
+        _, selfTime, cumulativeTime, name = [field.strip() for field in line.replace('import time:', '|', 1).split('|')]
+        modules[name] = {'selfUs':int(selfTime), 'cumulativeUs':int(cumulativeTime)}
+
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark how long it takes to start the My EE modules and command line.')
+    parser.add_argument('--iterations', type=int, default=20, help='How many times each scenario is started (default: 20).')
+    parser.add_argument('--top', type=int, default=5, help='How many of the slowest imports to show for each scenario (default: 5).')
+    parser.add_argument('--output', help='Save the results as JSON to this file.')
+    parser.add_argument('--compare', help='Compare the results with those previously saved to this file.')
+    args = parser.parse_args()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, 'r') as in_file:
+            previous = json.load(in_file)['results']
+
+    print('* Benchmarking ' + str(args.iterations) + ' cold starts of each scenario.')
+    print('  {0:<26} {1:>9} {2:>9} {3:>12}  {4}'.format('Scenario', 'p50 ms', 'Min ms', 'Imports ms', 'Heavy modules imported'))
+
+    results = {}
+    interpreterModules = {}
+    for name, arguments in scenarios:
+        # The wall clock time of the whole process (including the interpreter itself).
+        timings = sorted(run(arguments)[0] for _ in range(args.iterations))
+
+        # What was imported (and how long each import took) on top of what the interpreter imports on its own.
+        modules = parseImportTime(run(arguments, True)[1])
+        if not interpreterModules: interpreterModules = dict(modules)
+        else: modules = dict((moduleName, module) for moduleName, module in modules.items() if moduleName not in interpreterModules)
+
+        result = results[name] = {
+            'p50Ms': round(1000 * timings[len(timings) // 2], 2),
+            'minMs': round(1000 * timings[0], 2),
+            'importsMs': round(sum(module['selfUs'] for module in modules.values()) / 1000.0, 2),
+            'heavyModules': [module for module in heavyModules if module in modules]
+        }
+        print('  {0:<26} {1:>9} {2:>9} {3:>12}  {4}'.format(name, result['p50Ms'], result['minMs'], result['importsMs'], ', '.join(result['heavyModules']) or '-'))
+
+        # Show how the timings changed since the previous run.
+        if name in previous:
+            changes = []
+            for key in ('p50Ms', 'minMs', 'importsMs'):
+                if previous[name].get(key):
+                    changes.append(key + ' ' + '{0:+.1f}%'.format(100.0 * (result[key] - previous[name][key]) / previous[name][key]))
+            print('    (' + ', '.join(changes) + ')')
+
+        # The slowest imports (including everything they imported).
+        for moduleName, module in sorted(modules.items(), key=lambda item: item[1]['cumulativeUs'], reverse=True)[:args.top]:
+            print('    - ' + moduleName + ': ' + str(round(module['cumulativeUs'] / 1000.0, 2)) + ' ms')
+
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            json.dump({'settings':vars(args), 'results':results}, out_file, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# We measure the time taken, the peak memory used and the bytes on the wire.
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Allow this script to be run from the benchmarks folder or the repository root.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# The local stand-in for the EE servers.
+from mockserver import MockEEServer
+
+# Third party library that requests makes its connections with; "pip install requests" if getting import errors.
+import urllib3
+
+# All the shared functions are in this package.
+from shared import streaming
+from shared.htmlforms import extractForm
+from shared.instrumentation import Instrumentation
+from shared.myee import MyEE
+
+def serveMockServer(urlQueue, records, padding, certFile):
+    # The mock server runs in its own process so the memory it uses to build the responses is not counted.
+    mockServer = MockEEServer(records=records, padding=padding, compression=True, certFile=certFile)
+    urlQueue.put(mockServer.url)
+    mockServer.serve_forever()
+
+def createCertificate(directory):
+    # A throwaway self-signed certificate (and key) for 127.0.0.1, which the client is then told to trust.
+    certFile = os.path.join(directory, 'mockserver.pem')
+    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1', '-keyout', certFile, '-out', certFile], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ['REQUESTS_CA_BUNDLE'] = certFile
+    return certFile
+
+def bufferedFamilyGiftingAuth(myEE):
+    # The previous implementation of MyEE.familyGiftingAuth() (the whole page is downloaded before it is parsed).
+    response = myEE.request('familyGiftingAuth', myEE.requestsSession, 'GET', url=MyEE.myAccountHost + '/plans-subscriptions/mobile/data-gifting', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':myEE.MyAccountSessionID}, allow_redirects=False)
+    return extractForm(response.text, action='/app/family-gifting?fa=giftData', ids=('csrf',))[1]['csrf']
+
+def consume(records):
+    # Every record is looked at once (and then thrown away) as a report or sync would.
+    return sum(1 for _ in records)
+
+# Each step is read the buffered way (as before) and the streamed way.
+scenarios = (
+    ('usageDetails', lambda myEE: consume(MyEE.extractRecords(myEE.usageDetails())), lambda myEE: consume(myEE.iterUsageDetails())),
+    ('paymentHistory', lambda myEE: consume(MyEE.extractRecords(myEE.paymentHistory())), lambda myEE: consume(myEE.iterPaymentHistory())),
+    ('familyGiftingHistory', lambda myEE: consume(MyEE.extractRecords(myEE.familyGiftingHistory())), lambda myEE: consume(myEE.iterFamilyGiftingHistory())),
+    ('familyGiftingAuth', bufferedFamilyGiftingAuth, lambda myEE: myEE.familyGiftingAuth())
+)
+
+# The data gifting page is almost always followed by a data gifting request to the same host (so whether its connection is kept matters).
+pairModes = (
+    ('buffered', streaming.drainLimit, bufferedFamilyGiftingAuth),
+    ('closed', 0, lambda myEE: myEE.familyGiftingAuth()),
+    ('drained', streaming.drainLimit, lambda myEE: myEE.familyGiftingAuth())
+)
+
+# The connections the client has opened so far (each of which cost a TCP, and with --tls a TLS, handshake).
+connectionsOpened = [0]
+
+def countConnections(connect):
+    # A dropped connection is re-opened by the same connection object, so the connects themselves are counted.
+    def countedConnect(self):
+        connectionsOpened[0] += 1
+        return connect(self)
+    return countedConnect
+
+urllib3.connection.HTTPConnection.connect = countConnections(urllib3.connection.HTTPConnection.connect)
+urllib3.connection.HTTPSConnection.connect = countConnections(urllib3.connection.HTTPSConnection.connect)
+
+def measurePair(myEE, drainLimit, authFunction, iterations):
+    streaming.drainLimit = drainLimit
+
+    # The fastest of several page and request pairs (and how many new connections they needed).
+    seconds = []
+    connections = connectionsOpened[0]
+    for _ in range(iterations):
+        startTime = time.perf_counter()
+        myEE.familyGiftingSubscriptionDataAllowance(authFunction(myEE))
+        seconds.append(time.perf_counter() - startTime)
+
+    return min(seconds) * 1000, (connectionsOpened[0] - connections) / float(iterations)
+
+def measure(myEE, instrumentation, step, function, iterations):
+    # The peak memory (in KiB) allocated during one call (the first call also makes sure the data gifting token has been fetched).
+    function(myEE)
+    tracemalloc.start()
+    function(myEE)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # The fastest of several calls.
+    before = instrumentation.summary().get(step, {})
+    seconds = []
+    for _ in range(iterations):
+        startTime = time.perf_counter()
+        function(myEE)
+        seconds.append(time.perf_counter() - startTime)
+    after = instrumentation.summary()[step]
+
+    # The body bytes of each call (after decompression and on the wire).
+    bytesRead = (after['bytes'] - before.get('bytes', 0)) / float(iterations)
+    wireBytes = (after['wireBytes'] - before.get('wireBytes', 0)) / float(iterations)
+    return min(seconds) * 1000, peak / 1024.0, bytesRead / 1024.0, wireBytes / 1024.0
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reading the large My EE responses buffered and streamed, with and without compression.')
+    parser.add_argument('--records', type=int, default=20000, help='How many records the history end-points return (default: 20000).')
+    parser.add_argument('--padding', type=int, default=100, help='Extra characters added to every record (default: 100).')
+    parser.add_argument('--iterations', type=int, default=5, help='How many times each call is timed (default: 5).')
+    parser.add_argument('--tls', action='store_true', help='Serve HTTPS with a throwaway self-signed certificate (needs the openssl command).')
+    args = parser.parse_args()
+
+    # (Optionally) every new connection costs a TLS handshake, as it does with the real servers.
+    certificateDirectory = tempfile.mkdtemp() if args.tls else None
+    certFile = createCertificate(certificateDirectory) if args.tls else None
+
+    # The mock server compresses whatever the client asks it to.
+    urlQueue = multiprocessing.Queue()
+    mockServerProcess = multiprocessing.Process(target=serveMockServer, args=(urlQueue, args.records, args.padding, certFile))
+    mockServerProcess.daemon = True
+    mockServerProcess.start()
+
+    # Point every host the client knows about at the mock server.
+    MyEE.myAccountHost = MyEE.azureB2CHost = MyEE.eeIDHost = urlQueue.get()
+
+    instrumentation = Instrumentation()
+    myEE = MyEE('benchmark@example.com', 'password', instrumentation=instrumentation)
+
+    try:
+        import ijson
+        print('* Parsing JSON incrementally with ijson (' + ijson.backend + ').')
+    except ImportError:
+        print('* ijson is not installed so streamed JSON is parsed all at once ("pip install ijson").')
+
+    print('* ' + str(args.records) + ' records of ' + str(args.padding) + ' characters padding, fastest of ' + str(args.iterations) + ' calls:')
+    print('  {0:<22} {1:<9} {2:<9} {3:>9} {4:>12} {5:>10} {6:>12}'.format('Step', 'Encoding', 'Mode', 'ms/call', 'Peak KiB', 'Body KiB', 'Wire KiB'))
+
+    acceptEncoding = myEE.requestsSession.headers['Accept-Encoding']
+    for encoding in ('identity', acceptEncoding):
+        # The same session is used both uncompressed and compressed.
+        myEE.requestsSession.headers['Accept-Encoding'] = encoding
+
+        for step, bufferedFunction, streamedFunction in scenarios:
+            for mode, function in (('buffered', bufferedFunction), ('streamed', streamedFunction)):
+                milliseconds, peakKiB, bodyKiB, wireKiB = measure(myEE, instrumentation, step, function, args.iterations)
+                print('  {0:<22} {1:<9} {2:<9} {3:9.2f} {4:12.1f} {5:10.1f} {6:12.1f}'.format(step, encoding.split(',')[0], mode, milliseconds, peakKiB, bodyKiB, wireKiB))
+
+    print('* The data gifting page followed by a data gifting request (' + ('HTTPS' if args.tls else 'HTTP') + '), fastest of ' + str(args.iterations) + ' pairs:')
+    print('  {0:<9} {1:<9} {2:>9} {3:>16}'.format('Encoding', 'Page', 'ms/pair', 'Connections/pair'))
+
+    for encoding in ('identity', acceptEncoding):
+        myEE.requestsSession.headers['Accept-Encoding'] = encoding
+
+        for mode, drainLimit, authFunction in pairModes:
+            milliseconds, connections = measurePair(myEE, drainLimit, authFunction, args.iterations)
+            print('  {0:<9} {1:<9} {2:9.2f} {3:16.2f}'.format(encoding.split(',')[0], mode, milliseconds, connections))
+
+    mockServerProcess.terminate()
+    if certificateDirectory: shutil.rmtree(certificateDirectory)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# The mock server can also be run on its own.
+import argparse
+
+# Responses get an ETag so conditional requests can be tested (and can be compressed).
+import gzip
+import hashlib
+
+# Most end-points return JSON.
+import json
+
+# Every login and session gets its own random tokens (and errors can be injected at random).
+import random
+import sys
+
+# (Optionally) the mock server speaks HTTPS as the real servers do.
+import ssl
+import threading
+import time
+import uuid
+
+# The mock server is built entirely on the standard library.
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class MockEEServer(ThreadingHTTPServer):
+
+    # The API Gateway, EE ID, "MyAccount" and Azure AD B2C hosts are all served from the one mock server.
+    tenant = '/mock.onmicrosoft.com/B2C_1A_SignIn'
+    policy = 'B2C_1A_SignIn'
+    api = 'CombinedSigninAndSignup'
+
+    # The amounts (in MB) EE allows to be gifted at once.
+    giftingAmountsInMB = (250, 500, 1024, 2048, 5120, 10240)
+
+    # Threads handling requests should not stop the process from exiting.
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, records=50, padding=0, lines=('447123456789', '447987654321'), credentials=None, errorRate=0.0, compression=False, certFile=None, keyFile=None):
+        ThreadingHTTPServer.__init__(self, (host, port), MockEERequestHandler)
+
+        # (Optionally) every connection starts with a TLS handshake (so the cost of new connections can be measured).
+        self.tls = certFile is not None
+        if self.tls:
+            sslContext = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            sslContext.load_cert_chain(certFile, keyFile)
+            self.socket = sslContext.wrap_socket(self.socket, server_side=True)
+
+        # How long (in seconds) every request takes and how big the responses are.
+        self.latency = latency
+        self.records = records
+        self.padding = padding
+
+        # The fraction of requests that are throttled (429) or fail (503) as EE and Azure AD B2C sometimes do under load.
+        self.errorRate = errorRate
+
+        # Whether responses are gzip compressed (when the client accepts it) as the real servers do.
+        self.compression = compression
+
+        # The account's lines (each starts with 20 GB that can be gifted) and (optionally) the only username and password allowed to log in.
+        self.lines = list(lines)
+        self.giftingRemainingMB = dict((line, 20480) for line in self.lines)
+        self.credentials = credentials
+
+        # The state of the logins and sessions (a response may be sent while it is locked).
+        self.lock = threading.RLock()
+        self.transactions = {}
+        self.sessions = {}
+
+        # What has been requested (so a benchmark can count round trips and bytes).
+        self.resetStatistics()
+
+    @property
+    def url(self):
+        return ('https://' if self.tls else 'http://') + self.server_address[0] + ':' + str(self.server_address[1])
+
+    def start(self):
+        # Serve requests on a background thread.
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # A client that stops reading a streamed response part way through (once it has what it needs) just closes the connection.
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError, ssl.SSLError)): return
+        ThreadingHTTPServer.handle_error(self, request, client_address)
+
+    def resetStatistics(self):
+        with self.lock:
+            self.statistics = {'requests':0, 'bytesSent':0, 'bytesReceived':0, 'paths':{}}
+
+    def recordRequest(self, path, bytesReceived, bytesSent):
+        with self.lock:
+            self.statistics['requests'] += 1
+            self.statistics['bytesReceived'] += bytesReceived
+            self.statistics['bytesSent'] += bytesSent
+            self.statistics['paths'][path] = self.statistics['paths'].get(path, 0) + 1
+
+    def snapshotStatistics(self):
+        with self.lock:
+            return json.loads(json.dumps(self.statistics))
+
+    def pad(self, record):
+        # Makes the responses as large as a benchmark needs.
+        if self.padding: record['padding'] = 'x' * self.padding
+        return record
+
+    def allowedDataTransferAmounts(self, line):
+        return [{'giftingAmountInMB':amount, 'giftingDisplayAmount':str(amount // 1024 if amount >= 1024 else amount), 'giftingDisplayUnits':'GB' if amount >= 1024 else 'MB'} for amount in MockEEServer.giftingAmountsInMB if amount <= self.giftingRemainingMB[line]]
+
+class MockEERequestHandler(BaseHTTPRequestHandler):
+
+    # Keep-alives behave like the real servers (and small responses are not held back by Nagle's algorithm).
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Requests are counted rather than logged.
+        pass
+
+    def flush_headers(self):
+        # Count the bytes of the status line and headers.
+        self.headerBytes = sum(len(header) for header in getattr(self, '_headers_buffer', []))
+        BaseHTTPRequestHandler.flush_headers(self)
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self):
+        # Simulate the network and server latency.
+        if self.server.latency: time.sleep(self.server.latency)
+
+        # Parse everything about the request.
+        parsedURL = urlparse(self.path)
+        self.query = dict((name, values[0]) for name, values in parse_qs(parsedURL.query).items())
+        contentLength = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(contentLength).decode('utf-8') if contentLength else ''
+        self.form = dict((name, values[0]) for name, values in parse_qs(body).items())
+        self.requestCookies = dict((name, morsel.value) for name, morsel in SimpleCookie(self.headers.get('Cookie', '')).items())
+        self.responseCookies = []
+        self.headerBytes = 0
+        self.requestBytes = len(self.requestline) + len(str(self.headers)) + contentLength
+
+        # (Optionally) throttle or fail the request before it has had any effect.
+        if self.server.errorRate and random.random() < self.server.errorRate:
+            return self.respond(random.choice((429, 503)), 'Service Unavailable', headers={'Retry-After':'0'})
+
+        # Route the request to its handler.
+        handler = MockEERequestHandler.routes.get((self.command, parsedURL.path))
+        if not handler and self.command == 'GET' and parsedURL.path.startswith('/app/api/'):
+            handler = MockEERequestHandler.api
+        if not handler and parsedURL.path.startswith(MockEEServer.tenant):
+            handler = MockEERequestHandler.azureB2C
+
+        if handler:
+            handler(self)
+        else:
+            self.respond(404, 'Not Found')
+
+    def respond(self, status, content='', contentType='text/html; charset=utf-8', location=None, headers=None):
+        content = content.encode('utf-8')
+
+        # (Optionally) compress anything big enough to be worth it.
+        if self.server.compression and len(content) >= 1024 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            content = gzip.compress(content, 6)
+            headers = dict(headers or {}, **{'Content-Encoding':'gzip'})
+
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(content)))
+        if location: self.send_header('Location', location)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        for name, value in self.responseCookies:
+            self.send_header('Set-Cookie', name + '=' + value + '; Path=/; HttpOnly')
+        self.end_headers()
+
+        # The request is counted before the body is sent so the client can never see a response that has not been counted yet.
+        self.server.recordRequest(urlparse(self.path).path, self.requestBytes, self.headerBytes + len(content))
+
+        if self.command != 'HEAD': self.wfile.write(content)
+        return len(content)
+
+    def redirect(self, location):
+        return self.respond(302, location=self.server.url + location)
+
+    def setCookie(self, name, value):
+        self.responseCookies.append((name, value))
+
+    def respondJSON(self, value):
+        content = json.dumps(value)
+
+        # Identical responses can be revalidated with a conditional request.
+        etag = '"' + hashlib.sha1(content.encode('utf-8')).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            return self.respond(304, headers={'ETag':etag})
+
+        return self.respond(200, content, 'application/json;charset=UTF-8', headers={'ETag':etag})
+
+    def session(self):
+        # The "MyAccount" session this request belongs to (if it is logged in).
+        return self.server.sessions.get(self.requestCookies.get('MYACCOUNTSESSIONID'))
+
+    # EE ID and the API Gateway.
+
+    def idLogin(self):
+        # An anonymous EE ID session is started and the client is sent to the API Gateway.
+        self.setCookie('EEIDWEBSESSIONID', uuid.uuid4().hex)
+        return self.redirect('/gateway/authorize?flow=eeid')
+
+    def gatewayAuthorize(self):
+        # Logging into "MyAccount" requires the API Gateway session from the EE ID login.
+        if self.query.get('flow') == 'myaccount' and not (self.requestCookies.get('OPBS') and self.requestCookies.get('SID')):
+            return self.respond(401, 'Unauthorized')
+
+        return self.redirect('/b2c/authorize?flow=' + self.query.get('flow', 'eeid'))
+
+    def gatewayCallback(self):
+        # The API Gateway exchanges the Azure AD B2C code.
+        if not self.form.get('code'):
+            return self.redirect('/eeid/callback?error=invalid_request')
+
+        self.setCookie('OPBS', uuid.uuid4().hex)
+        self.setCookie('SID', uuid.uuid4().hex)
+        return self.redirect(('/app/callback' if self.form.get('state') == 'myaccount' else '/eeid/callback') + '?code=' + uuid.uuid4().hex)
+
+    def eeIDCallback(self):
+        # EE ID is now authenticated.
+        if not self.requestCookies.get('EEIDWEBSESSIONID'):
+            return self.respond(401, 'Unauthorized')
+
+        self.setCookie('EEIDWEBSESSIONID', uuid.uuid4().hex)
+        return self.redirect('/id/dashboard')
+
+    def eeIDDashboard(self):
+        return self.redirect('/myaccount/app')
+
+    def myAccountRedirect(self):
+        # "myaccount.ee.co.uk/app" moves to "ee.co.uk/app".
+        return self.redirect('/app')
+
+    def myAccountApp(self):
+        # An unauthenticated "MyAccount" session is started and sent to the API Gateway.
+        self.setCookie('MYACCOUNTSESSIONID', uuid.uuid4().hex)
+        return self.redirect('/gateway/authorize?flow=myaccount')
+
+    def myAccountCallback(self):
+        if not self.requestCookies.get('MYACCOUNTSESSIONID'):
+            return self.respond(401, 'Unauthorized')
+
+        # The session is now authenticated.
+        sessionID = uuid.uuid4().hex
+        session = {'csrf':uuid.uuid4().hex, 'giftingCSRF':uuid.uuid4().hex, 'msisdn':self.server.lines[0]}
+        with self.server.lock:
+            self.server.sessions[sessionID] = session
+
+        self.setCookie('MYACCOUNTSESSIONID', sessionID)
+        self.setCookie('X-XSRF-MYACCOUNT-TOKEN', session['csrf'])
+        return self.redirect('/app/dashboard')
+
+    # Azure AD B2C.
+
+    def settingsPage(self, transaction):
+        settings = {'csrf':transaction['csrf'], 'transId':transaction['transId'], 'api':MockEEServer.api, 'hosts':{'tenant':MockEEServer.tenant, 'policy':MockEEServer.policy}}
+        return ('<!DOCTYPE html>\n<!-- CorrelationId: ' + transaction['correlationID'] + ' -->\n<html><head><title>Sign in</title>\n<script>\nvar SETTINGS = ' + json.dumps(settings) + ';\n</script>\n</head>'
+                '<body><div id="api"></div></body></html>')
+
+    def gatewayFormPage(self, flow):
+        # Azure AD B2C auto-submits the authorization code to the API Gateway.
+        return ('<!DOCTYPE html><html><head><title>Working...</title></head><body>'
+                '<form method="POST" name="hiddenform" action="' + self.server.url + '/gateway/callback">'
+                '<input type="hidden" name="state" id="state" value="' + flow + '" />'
+                '<input type="hidden" name="code" id="code" value="' + uuid.uuid4().hex + '" />'
+                '<noscript><p>Script is disabled. Click Submit to continue.</p><input type="submit" value="Submit" /></noscript>'
+                '</form><script>document.forms[0].submit();</script></body></html>')
+
+    def b2cAuthorize(self):
+        # The "MyAccount" login is single sign on so goes straight back to the API Gateway.
+        if self.query.get('flow') == 'myaccount':
+            return self.respond(200, self.gatewayFormPage('myaccount'))
+
+        # Otherwise the sign in page is shown.
+        transaction = {'transId':'StateProperties=' + uuid.uuid4().hex, 'csrf':uuid.uuid4().hex, 'correlationID':str(uuid.uuid4()), 'stage':'username'}
+        with self.server.lock:
+            self.server.transactions[transaction['transId']] = transaction
+
+        return self.respond(200, self.settingsPage(transaction))
+
+    def telemetry(self):
+        return self.respond(204)
+
+    def azureB2C(self):
+        path = urlparse(self.path).path
+        transaction = self.server.transactions.get(self.query.get('tx'))
+
+        # Each step has to use the transaction and CSRF token from the previous page.
+        if not transaction:
+            return self.respond(400, '{"status":"400","message":"Unknown transaction"}', 'application/json')
+
+        if self.command == 'POST' and path == MockEEServer.tenant + '/SelfAsserted':
+            if self.headers.get('X-CSRF-TOKEN') != transaction['csrf']:
+                return self.respond(200, '{"status":"400","message":"CSRF"}', 'application/json')
+
+            if transaction['stage'] == 'username':
+                transaction['username'] = self.form.get('signInName')
+                transaction['stage'] = 'usernameConfirm'
+            elif transaction['stage'] == 'password':
+                # (Optionally) check the username and password.
+                if self.server.credentials and self.server.credentials.get(self.form.get('signInName')) != self.form.get('password'):
+                    return self.respond(200, '{"status":"400","message":"Invalid username or password."}', 'application/json')
+                transaction['stage'] = 'passwordConfirm'
+            else:
+                return self.respond(200, '{"status":"400","message":"Unexpected step"}', 'application/json')
+
+            return self.respond(200, '{"status":"200"}', 'application/json')
+
+        if self.command == 'GET' and path == MockEEServer.tenant + '/api/' + MockEEServer.api + '/confirmed':
+            if self.query.get('csrf_token') != transaction['csrf']:
+                return self.respond(403, 'Forbidden')
+
+            # After the username the page asks for the password (with a new CSRF token).
+            if transaction['stage'] == 'usernameConfirm':
+                transaction['stage'] = 'password'
+                transaction['csrf'] = uuid.uuid4().hex
+                return self.respond(200, self.settingsPage(transaction))
+
+            # After the password the client is sent back to the API Gateway.
+            if transaction['stage'] == 'passwordConfirm':
+                with self.server.lock:
+                    self.server.transactions.pop(transaction['transId'], None)
+                return self.respond(200, self.gatewayFormPage('eeid'))
+
+        return self.respond(404, 'Not Found')
+
+    # "MyAccount".
+
+    def api(self):
+        session = self.session()
+
+        # An expired session gets sent back to the login page.
+        if not session:
+            return self.respond(302, location=self.server.url + '/id/login')
+
+        name = urlparse(self.path).path[len('/app/api/'):]
+        start = int(self.query.get('from', 0))
+
+        # The "to" position is inclusive (so "from=0&to=4" is the first 5 records).
+        end = int(self.query.get('to', self.server.records - 1)) + 1
+
+        # Paged end-points return part of a longer history.
+        if name in ('usagedata', 'plans-and-devices-details'):
+            return self.respondJSON([self.server.pad({'id':index, 'msisdn':session['msisdn'], 'date':'2023-01-' + str(1 + (index % 28)).zfill(2), 'amount':index * 10}) for index in range(start, min(end, self.server.records))])
+
+        # The history end-points return the whole history.
+        if name in ('datapass-history', 'payment-history', 'usage-details'):
+            return self.respondJSON([self.server.pad({'id':index, 'msisdn':session['msisdn'], 'date':'2023-01-' + str(1 + (index % 28)).zfill(2), 'amount':index * 10}) for index in range(self.server.records)])
+
+        return self.respondJSON(self.server.pad({'endpoint':name, 'msisdn':session['msisdn']}))
+
+    def switchMSISDN(self):
+        session = self.session()
+
+        if not session or self.form.get('csrf') != session['csrf'] or self.form.get('switchMsisdn') not in self.server.lines:
+            return self.respond(403, 'Forbidden')
+
+        session['msisdn'] = self.form['switchMsisdn']
+        return self.respondJSON({'status':'success', 'message':'Switch ctn successfully done.'})
+
+    def dataGiftingPage(self):
+        session = self.session()
+        if not session:
+            return self.respond(302, location=self.server.url + '/id/login')
+
+        # A large page with the data gifting form somewhere in the middle.
+        filler = ''.join('<div class="section"><h2>Section ' + str(index) + '</h2><p>' + ('Lorem ipsum dolor sit amet. ' * 4) + '</p></div>' for index in range(max(self.server.records, 1)))
+        return self.respond(200, '<!DOCTYPE html><html><head><title>Data gifting</title></head><body>' + filler +
+                            '<form action="/app/family-gifting?fa=giftData" method="post"><input type="hidden" name="csrf" id="csrf" value="' + session['giftingCSRF'] + '"></form>' +
+                            filler + '</body></html>')
+
+    def dataGifting(self):
+        session = self.session()
+        operation = self.query.get('fa')
+
+        # An expired session gets sent back to the login page.
+        if not session:
+            return self.respond(302, location=self.server.url + '/id/login')
+
+        # Every data gifting request needs the CSRF token from the data gifting page.
+        if self.form.get('csrf') != session['giftingCSRF']:
+            return self.respond(403, 'Forbidden')
+
+        if operation == 'subscriptionDataAllowance':
+            with self.server.lock:
+                return self.respondJSON([{'msisdn':line, 'amountRemaining':str(self.server.giftingRemainingMB[line] // 1024), 'amountRemainingUnits':'GB', 'isUnlimited':False, 'amountUsed':'0', 'amountUsedUnits':'GB', 'totalVolume':'20', 'totalVolumeUnits':'GB', 'allowedDataTransferAmounts':self.server.allowedDataTransferAmounts(line)} for line in self.server.lines])
+
+        if operation == 'showMoreGiftingHistory':
+            return self.respondJSON([self.server.pad({'id':index, 'supplierCtn':self.server.lines[0], 'consumerCtn':self.server.lines[-1], 'date':'2023-01-' + str(1 + (index % 28)).zfill(2), 'dataTransferMB':1024}) for index in range(self.server.records)])
+
+        if operation == 'giftData':
+            supplierCtn = self.form.get('supplierCtn')
+            dataTransferMB = int(self.form.get('dataTransferMB', 0))
+
+            with self.server.lock:
+                if supplierCtn not in self.server.lines or self.form.get('consumerCtn') not in self.server.lines or dataTransferMB not in [amount['giftingAmountInMB'] for amount in self.server.allowedDataTransferAmounts(supplierCtn)]:
+                    return self.respond(200, '<html><body><p>Data Gifting failed</p></body></html>')
+
+                self.server.giftingRemainingMB[supplierCtn] -= dataTransferMB
+
+            return self.respond(200, '<html><body><p>Data Gifting successful</p></body></html>')
+
+        return self.respond(404, 'Not Found')
+
+MockEERequestHandler.routes = {
+    ('GET', '/id/login'): MockEERequestHandler.idLogin,
+    ('GET', '/gateway/authorize'): MockEERequestHandler.gatewayAuthorize,
+    ('POST', '/gateway/callback'): MockEERequestHandler.gatewayCallback,
+    ('GET', '/eeid/callback'): MockEERequestHandler.eeIDCallback,
+    ('GET', '/id/dashboard'): MockEERequestHandler.eeIDDashboard,
+    ('GET', '/myaccount/app'): MockEERequestHandler.myAccountRedirect,
+    ('GET', '/app'): MockEERequestHandler.myAccountApp,
+    ('GET', '/app/callback'): MockEERequestHandler.myAccountCallback,
+    ('GET', '/b2c/authorize'): MockEERequestHandler.b2cAuthorize,
+    ('GET', '/telemetry'): MockEERequestHandler.telemetry,
+    ('POST', '/app/api/switchmsisdn'): MockEERequestHandler.switchMSISDN,
+    ('GET', '/plans-subscriptions/mobile/data-gifting'): MockEERequestHandler.dataGiftingPage,
+    ('POST', '/plans-subscriptions/mobile/data-gifting'): MockEERequestHandler.dataGifting
+}
+
+def useMockServer(myEEClass, server):
+    # Point every host the client knows about at the mock server (everything else comes from the mock's redirects).
+    myEEClass.myAccountHost = server.url
+    myEEClass.azureB2CHost = server.url
+    myEEClass.eeIDHost = server.url
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local stand-in for the EE login and My EE servers.')
+    parser.add_argument('--host', default='127.0.0.1', help='The address to listen on (default: 127.0.0.1).')
+    parser.add_argument('--port', type=int, default=8471, help='The port to listen on (default: 8471).')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to delay every response by (default: 0).')
+    parser.add_argument('--records', type=int, default=50, help='How many records the history end-points return (default: 50).')
+    parser.add_argument('--padding', type=int, default=0, help='Extra characters added to every record (default: 0).')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 429 or 503 (default: 0).')
+    parser.add_argument('--compression', action='store_true', help='Gzip compress responses when the client accepts it.')
+    parser.add_argument('--certfile', help='Serve HTTPS with this PEM certificate (default: HTTP).')
+    parser.add_argument('--keyfile', help='The private key of the certificate (default: in the certificate file).')
+    args = parser.parse_args()
+
+    mockServer = MockEEServer(args.host, args.port, args.latency, args.records, args.padding, errorRate=args.error_rate, compression=args.compression, certFile=args.certfile, keyFile=args.keyfile)
+    print('* Mock EE server listening on ' + mockServer.url + '.')
+
+    try:
+        mockServer.serve_forever()
+    except KeyboardInterrupt:
+        pass
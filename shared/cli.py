@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Support Python3 in Python2.
+from __future__ import print_function
+
+# Only the standard library is imported up front (each command imports what it needs) so the help and argument errors are instant.
+import argparse
+import sys
+
+# This module makes heavy use of JSON parsing.
+import json
+
+# Importing My EE does not import requests (that waits until the first My EE object is created).
+from shared.myee import MyEE
+
+# The end-points the "snapshot" command fetches when none are given.
+snapshotEndpoints = ('accountsummary', 'basic', 'freeDataUsage', 'planBill', 'spendCap')
+
+# The end-points the "endpoint" command can fetch (the data gifting ones fetch their own CSRF token).
+endpointNames = sorted(list(MyEE.apiEndpoints) + ['familyGiftingHistory', 'familyGiftingSubscriptionDataAllowance'])
+
+def log(message):
+    # Progress goes to stderr so stdout is only ever the JSON.
+    print(message, file=sys.stderr)
+
+class Credentials(dict):
+
+    def __init__(self, path, settings):
+        # The settings loaded from credentials.json (and where they came from).
+        dict.__init__(self, settings)
+        self.path = path
+
+    def __missing__(self, key):
+        # Only a missing setting is reported as missing from the file (a KeyError from a My EE response is not).
+        raise ValueError('"' + key + '" is missing from ' + self.path + '.')
+
+def loadCredentials(path):
+    with open(path, 'r') as in_file:
+        return Credentials(path, json.load(in_file))
+
+def login(credentials):
+    from shared.sessioncache import SessionCache
+    from shared.transport import Transport
+
+    # (Optional) Re-use a previously cached session rather than logging in every time.
+    sessionCache = SessionCache(credentials['MyEE_SessionCacheDirectory']) if credentials.get('MyEE_SessionCacheDirectory') else None
+
+    log('* Logging into My EE.')
+    return MyEE(credentials['MyEE_Username'], credentials['MyEE_Password'], sessionCache, transport=Transport())
+
+def gift(args, credentials):
+    from shared.datagift import giftLargestAmount, largestGiftingAmount
+
+    donorMSISDN = args.donor or credentials['MyEE_DonorMSISDN']
+    recipientMSISDN = args.recipient or credentials['MyEE_RecipientMSISDN']
+    myEE = login(credentials)
+
+    # Only work out what would be gifted.
+    if args.dry_run:
+        donorSubscription, giftingAmountInMB, giftingDisplayString = largestGiftingAmount(myEE.familyGiftingSubscriptionDataAllowance(), donorMSISDN)
+        if not donorSubscription:
+            raise ValueError('Donor MSISDN ' + donorMSISDN + ' not found.')
+
+        return {'donorMSISDN':donorMSISDN, 'recipientMSISDN':recipientMSISDN, 'status':'dry run', 'giftingAmountInMB':giftingAmountInMB, 'giftingDisplayString':giftingDisplayString}
+
+    log('* Gifting data from ' + donorMSISDN + ' to ' + recipientMSISDN + '.')
+    result = giftLargestAmount(credentials['MyEE_Username'], None, donorMSISDN, recipientMSISDN, myEE=myEE)
+
+    # There is no need to show the e-mail address.
+    del result['username']
+
+    if result['status'] == 'failed':
+        raise ValueError(result.get('error', 'Data gifting was not successful.'))
+
+    return result
+
+def parseTargets(targets):
+    # Each target is "MSISDN=MB".
+    parsedTargets = {}
+    for target in targets:
+        msisdn, _, targetMB = target.partition('=')
+        if not targetMB.isdigit():
+            raise ValueError('Invalid target "' + target + '" (expected MSISDN=MB).')
+        parsedTargets[msisdn] = int(targetMB)
+
+    return parsedTargets
+
+def plan(args, credentials):
+    from shared.giftplanner import executePlan, planGifts
+
+    # The targets and donors default to those in credentials.json.
+    targets = parseTargets(args.targets) if args.targets else credentials['MyEE_GiftingTargets']
+    donorMSISDNs = args.donors or credentials.get('MyEE_GiftingDonors')
+    myEE = login(credentials)
+
+    # Plan the fewest gifts from the current allowances.
+    giftPlan = planGifts(myEE.familyGiftingSubscriptionDataAllowance(), targets, donorMSISDNs, args.max_overshoot)
+    log('* Planned ' + str(len(giftPlan['gifts'])) + ' gift(s) for ' + str(len(targets)) + ' recipient(s).')
+    shortfallMB = sum(recipient['shortfallMB'] for recipient in giftPlan['recipients'].values())
+    if shortfallMB: log('* The donors are ' + str(shortfallMB) + ' MB short of the targets.')
+    if args.dry_run: return giftPlan
+
+    # Perform the data gifting.
+    giftPlan['results'] = executePlan(myEE, giftPlan)
+    failures = [result for result in giftPlan['results'] if result['status'] != 'gifted']
+    if failures:
+        log('* ' + str(len(failures)) + ' gift(s) failed.')
+        print(json.dumps(giftPlan, indent=4))
+        raise ValueError('Data gifting was not successful.')
+
+    return giftPlan
+
+def usage(args, credentials):
+    myEE = login(credentials)
+
+    # Switching to the SIM.
+    msisdn = args.msisdn or credentials['MyEE_DonorMSISDN']
+    if not myEE.switchMSISDN(msisdn):
+        raise ValueError('Failed to switch to MSISDN ' + msisdn + '.')
+
+    return myEE.dataPassHistory()
+
+def snapshot(args, credentials):
+    endpoints = args.endpoints or snapshotEndpoints
+    for name in endpoints:
+        if name not in endpointNames:
+            raise ValueError('Unknown end-point "' + name + '" (expected one of ' + ', '.join(endpointNames) + ').')
+
+    myEE = login(credentials)
+
+    # All the end-points are fetched for the one line (switching to it at most once).
+    results = myEE.batch([(args.msisdn, name) for name in endpoints])
+    return results[args.msisdn]
+
+def endpoint(args, credentials):
+    myEE = login(credentials)
+
+    if args.msisdn and not myEE.switchMSISDN(args.msisdn):
+        raise ValueError('Failed to switch to MSISDN ' + args.msisdn + '.')
+
+    return getattr(myEE, args.name)()
+
+def createParser():
+    parser = argparse.ArgumentParser(prog='python -m shared', description='Query My EE and gift data from the command line.')
+    parser.add_argument('--credentials', default='credentials.json', help='JSON file with the username, password and MSISDNs (default: credentials.json).')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    giftParser = subparsers.add_parser('gift', help='Gift the largest amount of data allowed.')
+    giftParser.add_argument('--donor', help='The MSISDN to gift data from (default: "MyEE_DonorMSISDN").')
+    giftParser.add_argument('--recipient', help='The MSISDN to gift data to (default: "MyEE_RecipientMSISDN").')
+    giftParser.add_argument('--dry-run', action='store_true', help='Only show how much would be gifted.')
+    giftParser.set_defaults(function=gift)
+
+    planParser = subparsers.add_parser('plan', help='Gift data from several donors so every recipient gets at least its target.')
+    planParser.add_argument('targets', nargs='*', metavar='MSISDN=MB', help='Each recipient and the MB it should get (default: "MyEE_GiftingTargets").')
+    planParser.add_argument('--donor', dest='donors', action='append', metavar='MSISDN', help='A line to gift data from, may be repeated (default: "MyEE_GiftingDonors" or every line that is not a recipient).')
+    planParser.add_argument('--max-overshoot', type=int, metavar='MB', help='How many MB over its target a recipient may get to save gifts (default: less than the smallest amount).')
+    planParser.add_argument('--dry-run', action='store_true', help='Only show the plan.')
+    planParser.set_defaults(function=plan)
+
+    usageParser = subparsers.add_parser('usage', help='Show the data pass history.')
+    usageParser.add_argument('--msisdn', help='The MSISDN to show (default: "MyEE_DonorMSISDN").')
+    usageParser.set_defaults(function=usage)
+
+    snapshotParser = subparsers.add_parser('snapshot', help='Fetch several end-points at once.')
+    snapshotParser.add_argument('endpoints', nargs='*', metavar='endpoint', help='The end-points to fetch (default: ' + ', '.join(snapshotEndpoints) + ').')
+    snapshotParser.add_argument('--msisdn', help='The MSISDN to fetch them for (default: the current line).')
+    snapshotParser.set_defaults(function=snapshot)
+
+    endpointParser = subparsers.add_parser('endpoint', help='Fetch a single end-point.')
+    endpointParser.add_argument('name', choices=endpointNames, metavar='name', help='The end-point to fetch (one of ' + ', '.join(endpointNames) + ').')
+    endpointParser.add_argument('--msisdn', help='The MSISDN to fetch it for (default: the current line).')
+    endpointParser.set_defaults(function=endpoint)
+
+    return parser
+
+def main(argv=None):
+    args = createParser().parse_args(argv)
+
+    try:
+        result = args.function(args, loadCredentials(args.credentials))
+    except KeyError as exception:
+        # My EE sent back something other than what we expected.
+        log('* Error: Unexpected response from My EE (no ' + str(exception) + ').')
+        return 1
+    except (IOError, OSError, ValueError) as exception:
+        log('* Error: ' + str(exception))
+        return 1
+
+    print(json.dumps(result, indent=4))
+    return 0
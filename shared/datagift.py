@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Each stage of the data gifting is timed.
+import time
+
+# All the shared functions are in this package.
+from shared.myee import MyEE
+
+def largestGiftingAmount(allowances, donorMSISDN):
+    # Variables used to work out the maximum amount allowed to data gift.
+    donorSubscription = None
+    giftingAmountInMB = 0
+    giftingDisplayString = ''
+
+    # Work out how much data can be gifted.
+    for subscription in allowances:
+        # We are only interested in the donor MSISDN.
+        if subscription['msisdn'] != donorMSISDN: continue
+        donorSubscription = subscription
+
+        # Take each amount that can be gifted and work out the maximum amount allowed to data gift.
+        for allowedDataTransferAmount in subscription['allowedDataTransferAmounts']:
+            # Is this the largest allowable data gifting amount so far?
+            if allowedDataTransferAmount['giftingAmountInMB'] > giftingAmountInMB:
+                giftingAmountInMB = allowedDataTransferAmount['giftingAmountInMB']
+                giftingDisplayString = allowedDataTransferAmount['giftingDisplayAmount'] + ' ' + allowedDataTransferAmount['giftingDisplayUnits']
+
+    return donorSubscription, giftingAmountInMB, giftingDisplayString
+
+def giftLargestAmount(username, password, donorMSISDN, recipientMSISDN, sessionCache=None, rateLimiter=None, myEE=None, transport=None):
+    # The outcome of this account's data gifting (and how long each stage took).
+    result = {'username':username, 'donorMSISDN':donorMSISDN, 'recipientMSISDN':recipientMSISDN, 'status':'failed', 'giftingAmountInMB':0, 'timings':{}}
+
+    # Times each stage and stores the duration in the result.
+    def timed(stage, function, *args):
+        startTime = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            result['timings'][stage] = round(time.perf_counter() - startTime, 3)
+
+    try:
+        # Every account has its own My EE object (and so its own HTTP sessions) unless an already logged in one is passed.
+        if not myEE:
+            myEE = timed('login', lambda: MyEE(username, password, sessionCache, rateLimiter=rateLimiter, transport=transport))
+
+        # Get the data gifting allowance (this also fetches the data gifting token).
+        allowances = timed('familyGiftingSubscriptionDataAllowance', myEE.familyGiftingSubscriptionDataAllowance)
+        donorSubscription, giftingAmountInMB, giftingDisplayString = largestGiftingAmount(allowances, donorMSISDN)
+
+        if not donorSubscription:
+            result['error'] = 'Donor MSISDN not found.'
+        elif giftingAmountInMB == 0:
+            result['status'] = 'nothing to gift'
+        else:
+            # Perform the data gifting.
+            result['giftingAmountInMB'] = giftingAmountInMB
+            result['giftingDisplayString'] = giftingDisplayString
+
+            if timed('familyGifting', myEE.familyGifting, giftingAmountInMB, donorMSISDN, recipientMSISDN):
+                result['status'] = 'gifted'
+            else:
+                result['error'] = 'Data gifting was not successful.'
+    except Exception as exception:
+        # One account failing should not stop the others.
+        result['error'] = repr(exception)
+
+    result['timings']['total'] = round(sum(result['timings'].values()), 3)
+    return result
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The gifting amounts are reduced by their greatest common divisor to keep the tables small.
+from functools import reduce
+
+try:
+    # Python 3.5+
+    from math import gcd
+except ImportError:
+    # Python 2
+    from fractions import gcd
+
+# The units EE reports the remaining gifting allowance in.
+unitsInMB = {'MB':1, 'GB':1024, 'TB':1024 * 1024}
+
+class GiftingTable:
+
+    def __init__(self, amountsInMB):
+        # The fewest gifts (of these amounts) that add up to each total, worked out as far as has been needed so far.
+        self.amountsInMB = sorted(set(amountsInMB))
+        self.unit = reduce(gcd, self.amountsInMB)
+        self.amounts = [amountInMB // self.unit for amountInMB in self.amountsInMB]
+
+        # counts[total] is the fewest gifts making exactly "total" units (None if it cannot be made) and lastAmounts[total] the last gift.
+        self.counts = [0]
+        self.lastAmounts = [None]
+
+    def extend(self, total):
+        # Classic unbounded "coin change" dynamic programming (each total builds on the smaller ones).
+        for current in range(len(self.counts), total + 1):
+            bestCount = None
+            bestAmount = None
+
+            for amount in self.amounts:
+                if amount > current: break
+
+                previousCount = self.counts[current - amount]
+                if previousCount is not None and (bestCount is None or previousCount + 1 < bestCount):
+                    bestCount = previousCount + 1
+                    bestAmount = amount
+
+            self.counts.append(bestCount)
+            self.lastAmounts.append(bestAmount)
+
+    def fewestTotal(self, start, end):
+        # The total (from start up to end) that needs the fewest gifts (the smallest such total when there is a tie).
+        bestTotal = None
+        for total in range(start, end):
+            if self.counts[total] is not None and (bestTotal is None or self.counts[total] < self.counts[bestTotal]):
+                bestTotal = total
+
+        return bestTotal
+
+    def fewestGifts(self, targetMB, maxOvershootMB=None):
+        # The fewest gifts that reach at least the target without going over it by more than "maxOvershootMB" (with the least overshoot when there is a tie).
+        if targetMB <= 0: return []
+
+        # Any such set of gifts adds up to less than the target plus the largest amount (or a gift could be dropped).
+        target = -(-targetMB // self.unit)
+        limit = target + self.amounts[-1]
+        self.extend(limit)
+
+        # By default less than the smallest amount is wasted (which is always possible with just the smallest amount).
+        if maxOvershootMB is None: maxOvershootMB = self.amountsInMB[0] - 1
+        upperLimit = min(limit, ((targetMB + maxOvershootMB) // self.unit) + 1)
+
+        # Only go beyond the allowed overshoot if nothing within it can be made.
+        bestTotal = self.fewestTotal(target, upperLimit) or self.fewestTotal(upperLimit, limit)
+
+        # Walk back through the table for the gifts themselves (largest first).
+        gifts = []
+        while bestTotal:
+            gifts.append(self.lastAmounts[bestTotal] * self.unit)
+            bestTotal -= self.lastAmounts[bestTotal]
+
+        return sorted(gifts, reverse=True)
+
+def donorCapacities(allowances, donorMSISDNs=None):
+    # How much each donor can gift in total and the amounts each gift can be.
+    donors = {}
+
+    for subscription in allowances:
+        if donorMSISDNs and subscription['msisdn'] not in donorMSISDNs: continue
+
+        amountsInMB = sorted(allowedDataTransferAmount['giftingAmountInMB'] for allowedDataTransferAmount in subscription['allowedDataTransferAmounts'])
+        if not amountsInMB: continue
+
+        # The remaining allowance is only given for display (but a donor can always gift the largest amount it is offered).
+        try:
+            capacityMB = int(float(subscription['amountRemaining']) * unitsInMB[subscription['amountRemainingUnits'].upper()])
+        except (KeyError, TypeError, ValueError):
+            capacityMB = 0
+
+        donors[subscription['msisdn']] = {'capacityMB':max(capacityMB, amountsInMB[-1]), 'amountsInMB':amountsInMB}
+
+    return donors
+
+def planGifts(allowances, targets, donorMSISDNs=None, maxOvershootMB=None):
+    # Works out the fewest gifts (one familyGifting() request each) that give every recipient at least its target in MB (see GiftingTable.fewestGifts() for "maxOvershootMB").
+    # By default every line that is not a recipient is a donor.
+    if donorMSISDNs is None: donorMSISDNs = [subscription['msisdn'] for subscription in allowances if subscription['msisdn'] not in targets]
+    donors = donorCapacities(allowances, donorMSISDNs)
+    remainingMB = dict((msisdn, donor['capacityMB']) for msisdn, donor in donors.items())
+    gifts = []
+
+    # The fewest gift tables are shared by every recipient (and only rebuilt when fewer amounts are left).
+    tables = {}
+
+    # What each recipient still needs.
+    neededMB = dict((msisdn, targetMB) for msisdn, targetMB in targets.items() if targetMB > 0)
+
+    # The largest targets are planned first (they have the fewest ways to be met).
+    while neededMB:
+        progress = False
+
+        for recipientMSISDN in sorted(neededMB, key=lambda msisdn: (-neededMB[msisdn], msisdn)):
+            # Only the amounts a donor (other than the recipient) can still afford can be used.
+            amountsInMB = sorted(set(amountInMB for msisdn, donor in donors.items() if msisdn != recipientMSISDN for amountInMB in donor['amountsInMB'] if amountInMB <= remainingMB[msisdn]))
+            if not amountsInMB: continue
+
+            table = tables.get(tuple(amountsInMB))
+            if table is None: table = tables[tuple(amountsInMB)] = GiftingTable(amountsInMB)
+
+            # Each gift is taken from the donor with the least left that can still afford it (saving the larger allowances for the larger gifts).
+            for amountInMB in table.fewestGifts(neededMB[recipientMSISDN], maxOvershootMB):
+                candidates = [msisdn for msisdn, donor in donors.items() if msisdn != recipientMSISDN and amountInMB in donor['amountsInMB'] and remainingMB[msisdn] >= amountInMB]
+                if not candidates: continue
+
+                donorMSISDN = min(candidates, key=lambda msisdn: (remainingMB[msisdn], msisdn))
+                remainingMB[donorMSISDN] -= amountInMB
+                neededMB[recipientMSISDN] -= amountInMB
+                gifts.append({'donorMSISDN':donorMSISDN, 'recipientMSISDN':recipientMSISDN, 'giftingAmountInMB':amountInMB})
+                progress = True
+
+                if neededMB[recipientMSISDN] <= 0: break
+
+            if neededMB[recipientMSISDN] <= 0: del neededMB[recipientMSISDN]
+
+        # Stop once nothing more can be gifted (some recipients will be short).
+        if not progress: break
+
+    # Summarise the plan for each recipient and donor.
+    recipients = {}
+    for recipientMSISDN, targetMB in targets.items():
+        plannedMB = sum(gift['giftingAmountInMB'] for gift in gifts if gift['recipientMSISDN'] == recipientMSISDN)
+        recipients[recipientMSISDN] = {'targetMB':targetMB, 'plannedMB':plannedMB, 'shortfallMB':max(0, targetMB - plannedMB)}
+
+    donorSummary = dict((msisdn, {'capacityMB':donor['capacityMB'], 'plannedMB':donor['capacityMB'] - remainingMB[msisdn]}) for msisdn, donor in donors.items())
+    return {'gifts':gifts, 'recipients':recipients, 'donors':donorSummary}
+
+def executePlan(myEE, plan):
+    # Each gift is one familyGifting() request (the data gifting token is fetched once and re-used).
+    results = []
+
+    for gift in plan['gifts']:
+        result = dict(gift)
+
+        try:
+            result['status'] = 'gifted' if myEE.familyGifting(gift['giftingAmountInMB'], gift['donorMSISDN'], gift['recipientMSISDN']) else 'failed'
+        except Exception as exception:
+            # One gift failing should not stop the others.
+            result['status'] = 'failed'
+            result['error'] = repr(exception)
+
+        results.append(result)
+
+    return results
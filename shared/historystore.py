@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Records without an ID are keyed by a hash of their contents (and we never store the account e-mail address).
+import hashlib
+
+# The records are stored as JSON.
+import json
+
+# The history is kept in a local SQLite database (which may be shared by several threads) that only this user can read.
+import os
+import sqlite3
+import threading
+import time
+
+# Dates are normalised so they can be compared.
+from datetime import datetime, timezone
+
+# All the shared functions are in this package.
+from shared.myee import MyEE
+
+class HistoryStore:
+
+    # The history end-points that can be synchronised (and whether they need the data gifting CSRF token).
+    histories = {
+        'dataPassHistory': False,
+        'familyGiftingHistory': True,
+        'paymentHistory': False,
+        'usageDetails': False
+    }
+
+    # The large history end-points are read (and stored) a record at a time rather than all at once.
+    streamedHistories = {
+        'familyGiftingHistory': 'iterFamilyGiftingHistory',
+        'paymentHistory': 'iterPaymentHistory',
+        'usageDetails': 'iterUsageDetails'
+    }
+
+    # The fields that may uniquely identify a record and the fields that may hold its date (the first one found is used).
+    idKeys = ('id', 'transactionId', 'transactionID', 'paymentId', 'reference', 'orderId')
+    dateKeys = ('date', 'transactionDate', 'paymentDate', 'giftingDate', 'purchaseDate', 'startDate', 'timestamp')
+
+    # The date formats EE uses (which are normalised to ISO 8601).
+    dateFormats = ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d/%m/%Y %H:%M', '%d/%m/%Y', '%d %b %Y', '%d %B %Y')
+
+    # How many records are stored at a time (the lock is not held while the rest of a streamed history downloads).
+    batchSize = 500
+
+    def __init__(self, path):
+        # The database holds payment and gifting history so (like the session and response caches) only this user may read it (SQLite gives its journal the same permissions).
+        if path != ':memory:':
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(path, 0o600)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+        # Every record is stored once per account, MSISDN and history.
+        self.connection.execute('CREATE TABLE IF NOT EXISTS records (account TEXT NOT NULL, msisdn TEXT NOT NULL, history TEXT NOT NULL, recordKey TEXT NOT NULL, recordDate TEXT, record TEXT NOT NULL, firstSeen REAL NOT NULL, PRIMARY KEY (account, msisdn, history, recordKey)) WITHOUT ROWID')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS recordsByDate ON records (account, msisdn, history, recordDate)')
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def accountKey(email):
+        # The account is stored as a hash of its e-mail address.
+        return hashlib.sha256(email.strip().lower().encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def recordKey(record):
+        # Prefer the record's own ID (otherwise identical records are the same record).
+        if isinstance(record, dict):
+            for idKey in HistoryStore.idKeys:
+                if record.get(idKey) is not None:
+                    return idKey + ':' + str(record[idKey])
+
+        return 'sha1:' + hashlib.sha1(json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def recordDate(record):
+        if not isinstance(record, dict): return None
+
+        for dateKey in HistoryStore.dateKeys:
+            value = record.get(dateKey)
+            if not value: continue
+
+            # Epoch timestamps (in seconds or milliseconds).
+            if isinstance(value, (int, float)):
+                return datetime.fromtimestamp(value / 1000.0 if value > 10000000000 else value, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+            # Dates in any of the known formats.
+            for dateFormat in HistoryStore.dateFormats:
+                try:
+                    return datetime.strptime(str(value).strip(), dateFormat).strftime('%Y-%m-%dT%H:%M:%S')
+                except ValueError:
+                    pass
+
+            # Anything else is kept as is.
+            return str(value)
+
+        return None
+
+    def add(self, email, msisdn, history, records):
+        # Only records we have not seen before are stored.
+        account = HistoryStore.accountKey(email)
+        firstSeen = time.time()
+        newRecords = 0
+
+        # The records are stored a batch at a time (so other threads can use the store while a streamed history is still being read).
+        rows = []
+        for record in records:
+            rows.append((account, str(msisdn or ''), history, HistoryStore.recordKey(record), HistoryStore.recordDate(record), json.dumps(record, sort_keys=True), firstSeen))
+
+            if len(rows) >= HistoryStore.batchSize:
+                newRecords += self.insert(rows)
+                rows = []
+
+        if rows: newRecords += self.insert(rows)
+        return newRecords
+
+    def insert(self, rows):
+        with self.lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany('INSERT OR IGNORE INTO records (account, msisdn, history, recordKey, recordDate, record, firstSeen) VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+            # How many were new.
+            return self.connection.total_changes - before
+
+    def sync(self, myEE, msisdn=None, histories=None, csrf=None):
+        # Switch to the requested line first (the history end-points are for the currently switched MSISDN).
+        if msisdn and not myEE.switchMSISDN(msisdn):
+            raise ValueError('Failed to switch to MSISDN ' + str(msisdn) + '.')
+
+        newRecords = {}
+        for history in (histories or sorted(HistoryStore.histories)):
+            # The family gifting history needs the data gifting CSRF token (which My EE fetches if none is given).
+            function = getattr(myEE, HistoryStore.streamedHistories.get(history, history))
+            result = function(csrf) if HistoryStore.histories[history] else function()
+
+            # A streamed history is already the records (which are stored as they arrive, the batches already stored are kept if the download fails part way and the rest are added by the next sync).
+            records = result if history in HistoryStore.streamedHistories else MyEE.extractRecords(result)
+            newRecords[history] = self.add(myEE.email, myEE.currentMSISDN, history, records)
+
+        return newRecords
+
+    def query(self, email, msisdn, history, start=None, end=None):
+        # Every stored record (between the optional ISO 8601 start and end dates), oldest first.
+        sql = 'SELECT record FROM records WHERE account = ? AND msisdn = ? AND history = ?'
+        parameters = [HistoryStore.accountKey(email), str(msisdn or ''), history]
+
+        if start:
+            sql += ' AND recordDate >= ?'
+            parameters.append(start)
+        if end:
+            sql += ' AND recordDate < ?'
+            parameters.append(end)
+
+        with self.lock:
+            return [json.loads(row[0]) for row in self.connection.execute(sql + ' ORDER BY recordDate, recordKey', parameters)]
+
+    def aggregate(self, email, msisdn, history, field=None, start=None, end=None, period='month'):
+        # The number of records (and the total of the optional numeric field) for each day, month or year.
+        periodLength = {'day':10, 'month':7, 'year':4}[period]
+        sql = 'SELECT substr(recordDate, 1, ?) AS period, COUNT(*), ' + ('TOTAL(CAST(json_extract(record, ?) AS REAL))' if field else '0') + ' FROM records WHERE account = ? AND msisdn = ? AND history = ?'
+        parameters = [periodLength] + (['$.' + field] if field else []) + [HistoryStore.accountKey(email), str(msisdn or ''), history]
+
+        if start:
+            sql += ' AND recordDate >= ?'
+            parameters.append(start)
+        if end:
+            sql += ' AND recordDate < ?'
+            parameters.append(end)
+
+        with self.lock:
+            return [{'period':row[0], 'count':row[1], 'total':row[2]} for row in self.connection.execute(sql + ' GROUP BY period ORDER BY period', parameters)]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Streamed pages arrive as bytes that may split a character.
+import codecs
+
+try:
+    # Python 3
+    from html.parser import HTMLParser
+except ImportError:
+    # Python 2
+    from HTMLParser import HTMLParser
+
+class FormFound(Exception):
+    # Raised inside the parser to stop it as soon as it has everything we need.
+    pass
+
+class FormExtractor(HTMLParser):
+
+    def __init__(self, action=None, ids=()):
+        HTMLParser.__init__(self)
+
+        # The form we want (the first form if no action is given) and the IDs of the elements whose values we want from it.
+        self.wantedAction = action
+        self.wantedIDs = tuple(ids)
+
+        # What we have found so far.
+        self.inForm = False
+        self.formFound = False
+        self.action = None
+        self.values = {}
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+
+        if not self.inForm:
+            # Is this the form we are looking for?
+            if tag == 'form' and not self.formFound and (self.wantedAction is None or attrs.get('action') == self.wantedAction):
+                self.inForm = True
+                self.formFound = True
+                self.action = attrs.get('action')
+        elif attrs.get('id') in self.wantedIDs and attrs['id'] not in self.values:
+            # This is one of the values we want.
+            self.values[attrs['id']] = attrs.get('value')
+
+        # Stop parsing as soon as every value has been found (the rest of the page is never looked at).
+        if self.inForm and len(self.values) == len(self.wantedIDs):
+            self.done = True
+            raise FormFound()
+
+    def handle_endtag(self, tag):
+        # There is no point reading past the end of the form.
+        if tag == 'form' and self.inForm:
+            self.inForm = False
+            self.done = True
+            raise FormFound()
+
+    def feed(self, data):
+        # Returns True once the form has been found and read (any further data is ignored).
+        if not self.done:
+            try:
+                HTMLParser.feed(self, data)
+            except FormFound:
+                pass
+
+        return self.done
+
+    def result(self):
+        # The page markup has changed if the form or any of its values cannot be found.
+        if not self.formFound:
+            raise ValueError('Unable to find the ' + ('"' + self.wantedAction + '" form' if self.wantedAction else 'form') + ' in the page (has the page changed?).')
+
+        for wantedID in self.wantedIDs:
+            if self.values.get(wantedID) is None:
+                raise ValueError('Unable to find a value for "' + wantedID + '" in the ' + ('"' + self.wantedAction + '" form' if self.wantedAction else 'form') + ' (has the page changed?).')
+
+        return self.action, self.values
+
+def extractForm(content, action=None, ids=()):
+    # Get the action URL of the form and the values of the requested elements within it.
+    formExtractor = FormExtractor(action, ids)
+    formExtractor.feed(content)
+    return formExtractor.result()
+
+def extractStreamedForm(chunks, encoding=None, action=None, ids=()):
+    # The same as extractForm() but for a page arriving in chunks of bytes (no more chunks are read once the form has been found).
+    formExtractor = FormExtractor(action, ids)
+
+    # Undecodable bytes are replaced (as requests does for response.text).
+    decoder = codecs.getincrementaldecoder(encoding or 'utf-8')('replace')
+
+    for chunk in chunks:
+        if formExtractor.feed(decoder.decode(chunk)): break
+
+    return formExtractor.result()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Events can be exported as JSON lines.
+import json
+
+# Several MyEE objects (on several threads) can share the one instrumentation.
+import os
+import threading
+import time
+
+try:
+    # Python 3
+    from urllib.parse import urlparse
+except ImportError:
+    # Python 2
+    from urlparse import urlparse
+
+class Instrumentation:
+
+    def __init__(self, callbacks=()):
+        # Every event is passed to each of these callables.
+        self.callbacks = list(callbacks)
+
+        # The running totals for each step.
+        self.steps = {}
+        self.lock = threading.Lock()
+
+    def addCallback(self, callback):
+        self.callbacks.append(callback)
+
+    def request(self, step, requestsSession, method, **kwargs):
+        event = {'type':'request', 'step':step, 'method':method, 'host':urlparse(kwargs.get('url', '')).netloc, 'timestamp':time.time()}
+        startTime = time.perf_counter()
+
+        try:
+            response = requestsSession.request(method, **kwargs)
+        except Exception as exception:
+            # Failed requests are recorded too.
+            event['seconds'] = time.perf_counter() - startTime
+            event['error'] = repr(exception)
+            self.emit(event)
+            raise
+
+        event['seconds'] = time.perf_counter() - startTime
+        event['status'] = response.status_code
+        event['redirects'] = len(response.history)
+
+        # A streamed body has not been read yet so it is counted by a separate "stream" event once it has been.
+        if kwargs.get('stream'):
+            event['bytes'] = event['wireBytes'] = 0
+        else:
+            # The bytes on the wire are before decompression (the bytes are after).
+            event['bytes'] = len(response.content) + sum(len(redirect.content) for redirect in response.history)
+            event['wireBytes'] = Instrumentation.wireBytes(response) + sum(Instrumentation.wireBytes(redirect) for redirect in response.history)
+
+        self.emit(event)
+        return response
+
+    @staticmethod
+    def wireBytes(response):
+        # How much of the body was read from the connection (only urllib3 responses count this).
+        try:
+            return response.raw.tell()
+        except (AttributeError, IOError, ValueError):
+            return 0
+
+    def parse(self, step, function, *args, **kwargs):
+        startTime = time.perf_counter()
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.emit({'type':'parse', 'step':step, 'seconds':time.perf_counter() - startTime, 'timestamp':time.time()})
+
+    def emit(self, event):
+        with self.lock:
+            totals = self.steps.get(event['step'])
+            if totals is None:
+                totals = self.steps[event['step']] = {'requests':0, 'errors':0, 'seconds':0.0, 'bytes':0, 'wireBytes':0, 'redirects':0, 'parses':0, 'parseSeconds':0.0, 'statuses':{}}
+
+            # Add this event to the step's running totals.
+            if event['type'] == 'parse':
+                totals['parses'] += 1
+                totals['parseSeconds'] += event['seconds']
+            elif event['type'] == 'stream':
+                # The time spent waiting for a streamed body is part of its request.
+                totals['seconds'] += event['seconds']
+                totals['bytes'] += event['bytes']
+                totals['wireBytes'] += event['wireBytes']
+            else:
+                totals['requests'] += 1
+                totals['seconds'] += event['seconds']
+
+                if 'error' in event:
+                    totals['errors'] += 1
+                else:
+                    totals['bytes'] += event['bytes']
+                    totals['wireBytes'] += event['wireBytes']
+                    totals['redirects'] += event['redirects']
+                    totals['statuses'][event['status']] = totals['statuses'].get(event['status'], 0) + 1
+
+        for callback in self.callbacks:
+            callback(event)
+
+    def summary(self):
+        # A copy of the running totals for each step.
+        with self.lock:
+            return json.loads(json.dumps(self.steps))
+
+class JSONLinesExporter:
+
+    def __init__(self, out_file):
+        # Each event is written as a line of JSON to this (already open) file.
+        self.out_file = out_file
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, sort_keys=True) + '\n'
+
+        with self.lock:
+            self.out_file.write(line)
+            self.out_file.flush()
+
+class PrometheusExporter:
+
+    # The metrics exported for each step (the name, the key in the totals, the type and the help text).
+    metrics = (
+        ('myee_requests_total', 'requests', 'counter', 'Requests sent.'),
+        ('myee_request_errors_total', 'errors', 'counter', 'Requests that failed without a response.'),
+        ('myee_request_seconds_total', 'seconds', 'counter', 'Time spent waiting for responses.'),
+        ('myee_response_bytes_total', 'bytes', 'counter', 'Response body bytes received (after decompression).'),
+        ('myee_response_wire_bytes_total', 'wireBytes', 'counter', 'Response body bytes read from the connection (before decompression).'),
+        ('myee_redirects_total', 'redirects', 'counter', 'Redirects followed.'),
+        ('myee_parse_seconds_total', 'parseSeconds', 'counter', 'Time spent parsing responses.')
+    )
+
+    def __init__(self, instrumentation):
+        # The metrics are rendered from the instrumentation's running totals.
+        self.instrumentation = instrumentation
+
+    @staticmethod
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def render(self):
+        steps = self.instrumentation.summary()
+        lines = []
+
+        for name, key, metricType, helpText in PrometheusExporter.metrics:
+            lines.append('# HELP ' + name + ' ' + helpText)
+            lines.append('# TYPE ' + name + ' ' + metricType)
+            for step, totals in sorted(steps.items()):
+                lines.append(name + '{step="' + PrometheusExporter.escape(step) + '"} ' + repr(totals[key]))
+
+        # The responses are also broken down by their HTTP status code.
+        lines.append('# HELP myee_responses_total Responses received by HTTP status code.')
+        lines.append('# TYPE myee_responses_total counter')
+        for step, totals in sorted(steps.items()):
+            for status, count in sorted(totals['statuses'].items()):
+                lines.append('myee_responses_total{step="' + PrometheusExporter.escape(step) + '",status="' + PrometheusExporter.escape(status) + '"} ' + str(count))
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        # Written atomically so that a node_exporter textfile collector never reads a partial file.
+        temporaryPath = path + '.tmp'
+        with open(temporaryPath, 'w') as out_file:
+            out_file.write(self.render())
+
+        os.replace(temporaryPath, path)
@@ -16,18 +16,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-# We set a cookiejar policy.
-import http.cookiejar
+# Batched requests are grouped by MSISDN.
+import collections
 
 # The login form (now hosted on Azure AD B2C) now relies on JavaScript.
 import json
 import re
 
-# Third party library to make HTTP(S) requests; "pip install requests" if getting import errors.
-import requests
+# A failed login step is restarted after a short wait.
+import time
 
-# Third party library to parse (X)HTML; "pip install beautifulsoup4" if getting import errors.
-from bs4 import BeautifulSoup
+# The heavier modules (requests, the cookie jar, the HTML parser and the thread pool) are only imported by the methods that need them, so importing this module stays fast.
+
+class SessionExpiredError(ValueError):
+    # Raised when My EE sends a request back to the login page (so the caller can log in again).
+    pass
 
 class MyEE:
 
@@ -37,21 +40,208 @@ class MyEE:
     # The Azure Active Directory B2C server.
     azureB2CHost = 'https://auth.ee.co.uk'
 
+    # The EE ID server (where the login starts).
+    eeIDHost = 'https://id.ee.co.uk'
+
+    # The "MyAccount" JSON API end-points (shared by every client so they only need to be defined once).
+    apiEndpoints = {
+        'accountsummary': '/app/api/accountsummary',
+        'addOnsAvailableData': '/app/api/add-ons-available-data',
+        'alerts': '/app/api/alerts',
+        'basic': '/app/api/basic',
+        'cTnPicker': '/app/api/ctnpicker',
+        'dataPassHistory': '/app/api/datapass-history',
+        'extraChargesDetails': '/app/api/extra-charges-details',
+        'extraChargesTotal': '/app/api/extra-charges-total',
+        'freeDataUsage': '/app/api/freedata-usage',
+        'myAddressPayM': '/app/api/my-address-paym',
+        'otherAllowances': '/app/api/other-allowances',
+        'paymentHistory': '/app/api/payment-history',
+        'planBill': '/app/api/plan-bill',
+        'plansAndDevicesDetails': '/app/api/plans-and-devices-details',
+        'roles': '/app/api/roles',
+        'spendCap': '/app/api/spendcap',
+        'usageData': '/app/api/usagedata',
+        'usageDetails': '/app/api/usage-details'
+    }
+
     # This prevents the requests module from creating its own user-agent (and ask to not be included in analytics).
     stealthyHeaders = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/109.0', 'DNT':'1'}
 
-    def __init__(self, email, password):
+    def __init__(self, email, password, sessionCache=None, rateLimiter=None, responseCache=None, instrumentation=None, transport=None):
+        # (Optional) Requests to each host can be throttled when many accounts are being run at once.
+        self.rateLimiter = rateLimiter
+
+        # (Optional) Requests can be retried, throttled and circuit broken when hosts are overloaded (this replaces the rate limiter).
+        self.transport = transport
+
+        # The last login step (or end-point) requested (so a failed login can say where it failed).
+        self.lastStep = None
+
+        # (Optional) The timings and sizes of each request can be recorded.
+        self.instrumentation = instrumentation
+
+        # (Optional) Responses from rarely changing end-points can be cached (per account and MSISDN).
+        self.email = email
+        self.responseCache = responseCache
+
+        # The MSISDN last switched to (None is whichever line My EE defaults to, which is looked up the first time the response cache needs it).
+        self.currentMSISDN = None
+        self.lookedUpMSISDN = False
+
+        # A cached session is shared with other processes (any of which may switch it to another line without us knowing).
+        self.sharedSession = sessionCache is not None
+
+        # The data gifting CSRF token is only fetched when it is first needed.
+        self.giftingCSRFToken = None
+
+        # We set a cookiejar policy.
+        import http.cookiejar
+
         # Session supports keep-alives but we disable cookie persistence (EE clutters requests with a LOT of cookies).
-        self.requestsSession = requests.Session()
+        self.requestsSession = self.createRequestsSession()
         self.requestsSession.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
 
-        # We need to be assigned CSRF and state tokens from the login page *before* we can login.
-        settingsJSON = self.getSession()
-
-        # Authenticate with My EE.
-        if not self.login(settingsJSON, email, password):
+        # Without a session cache we always perform the full login handshake.
+        if not sessionCache:
+            self.authenticate(email, password)
+            return
+
+        # Hold the account lock so that concurrent processes do not all log the same account in at once.
+        with sessionCache.lock(email):
+            cachedSession = sessionCache.load(email)
+
+            # Try to resume a previously cached session (this costs just the one request).
+            if cachedSession:
+                self.importSession(cachedSession)
+
+                if self.isSessionValid():
+                    sessionCache.statistics['hits'] += 1
+                    return
+
+                # The cached session has expired so we have to log in again.
+                sessionCache.statistics['refreshes'] += 1
+                sessionCache.delete(email)
+            else:
+                sessionCache.statistics['misses'] += 1
+
+            # Authenticate with My EE and cache the new session.
+            self.authenticate(email, password)
+            sessionCache.save(email, self.exportSession())
+
+    def createRequestsSession(self):
+        # Third party library to make HTTP(S) requests; "pip install requests" if getting import errors.
+        import requests
+
+        # Requests can optionally be throttled per host (and retried and circuit broken).
+        from shared.ratelimit import RateLimitedAdapter
+        from shared.transport import TransportAdapter
+
+        # Compressed responses are asked for explicitly (brotli only when it can be decoded).
+        from shared.streaming import acceptEncoding
+
+        requestsSession = requests.Session()
+        requestsSession.headers['Accept-Encoding'] = acceptEncoding()
+
+        # Every request made by this session goes through the transport (or just has to wait for the rate limiter).
+        if self.transport:
+            transportAdapter = TransportAdapter(self.transport)
+            requestsSession.mount('https://', transportAdapter)
+            requestsSession.mount('http://', transportAdapter)
+        elif self.rateLimiter:
+            rateLimitedAdapter = RateLimitedAdapter(self.rateLimiter)
+            requestsSession.mount('https://', rateLimitedAdapter)
+            requestsSession.mount('http://', rateLimitedAdapter)
+
+        return requestsSession
+
+    def request(self, step, requestsSession, method, **kwargs):
+        self.lastStep = step
+
+        # Without instrumentation the request is sent as is (so this costs next to nothing).
+        if not self.instrumentation:
+            return requestsSession.request(method, **kwargs)
+
+        return self.instrumentation.request(step, requestsSession, method, **kwargs)
+
+    def parse(self, step, function, *args, **kwargs):
+        # Without instrumentation the response is parsed as is (so this costs next to nothing).
+        if not self.instrumentation:
+            return function(*args, **kwargs)
+
+        return self.instrumentation.parse(step, function, *args, **kwargs)
+
+    def authenticate(self, email, password):
+        import requests
+        from shared.transport import CircuitOpenError
+
+        # Without a transport the login is only attempted once.
+        loginAttempts = self.transport.loginAttempts if self.transport else 1
+
+        for attempt in range(loginAttempts):
+            try:
+                # We need to be assigned CSRF and state tokens from the login page *before* we can login.
+                settingsJSON = self.getSession()
+
+                # Authenticate with My EE.
+                loggedIn = self.login(settingsJSON, email, password)
+                break
+            except CircuitOpenError:
+                # There is no point starting again while the host is failing.
+                raise
+            except (KeyError, AttributeError, ValueError, requests.exceptions.RequestException) as exception:
+                # A missing cookie, header or form means a step was throttled or failed so the tokens are no good (the login has to start again from the beginning).
+                if attempt + 1 >= loginAttempts:
+                    raise ValueError('Failed to login to My EE at step "' + str(self.lastStep) + '" (' + repr(exception) + ').')
+
+                self.transport.count('loginRestarts')
+                time.sleep(self.transport.backoff(attempt))
+
+        # The credentials were rejected (which is never retried in case the account gets locked out).
+        if not loggedIn:
             raise ValueError('Failed to login to My EE.')
 
+        # Any data gifting CSRF token (and switched line) belonged to the previous session.
+        self.giftingCSRFToken = None
+        self.currentMSISDN = None
+        self.lookedUpMSISDN = False
+
+    def exportSession(self):
+        # These are all the values required to resume this session later.
+        return {'MyAccountSessionID':self.MyAccountSessionID, 'MyAccountCSRFToken':self.MyAccountCSRFToken, 'OPBS':self.OPBS, 'SID':self.SID, 'EEIDWEBSESSIONID':self.EEIDWEBSESSIONID}
+
+    def importSession(self, session):
+        # Resume a session previously returned by exportSession().
+        self.MyAccountSessionID = session['MyAccountSessionID']
+        self.MyAccountCSRFToken = session['MyAccountCSRFToken']
+        self.OPBS = session['OPBS']
+        self.SID = session['SID']
+        self.EEIDWEBSESSIONID = session['EEIDWEBSESSIONID']
+
+        # Any data gifting CSRF token (and switched line) belonged to the previous session.
+        self.giftingCSRFToken = None
+        self.currentMSISDN = None
+        self.lookedUpMSISDN = False
+
+    def isSessionValid(self):
+        import requests
+
+        # An expired session gets redirected back to the login page rather than returning JSON.
+        try:
+            response = self.request('isSessionValid', self.requestsSession, 'GET', url=MyEE.myAccountHost + MyEE.apiEndpoints['basic'], headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False)
+        except requests.exceptions.RequestException:
+            return False
+
+        if response.status_code != 200:
+            return False
+
+        try:
+            response.json()
+        except ValueError:
+            return False
+
+        return True
+
     def extractSettingsJSON(self, content):
         # We obtain the login form details from the JavaScript of the login page as text.
         settingsText = re.search('^var SETTINGS = (?P<Settings>.*?);', content, flags=re.MULTILINE)
@@ -59,18 +249,17 @@ class MyEE:
         # Then we convert it to JSON so it is more accessible.
         return json.loads(settingsText.groups('Settings')[0])
 
-    def loginToAPIGateway(self, content):
-        # We use BeautifulSoup to parse the returned HTML.
-        soup = BeautifulSoup(content, 'html.parser')
+    def loginToAPIGateway(self, content, step='apiGatewayLogin'):
+        # We only need a few values from the (X)HTML forms.
+        from shared.htmlforms import extractForm
 
-        # Get the codes from the form.
-        form = soup.find('form')
-        actionURL = form.attrs.get('action')
-        state = form.find('input', {'id': 'state'}).get('value')
-        code = form.find('input', {'id': 'code'}).get('value')
+        # Get the codes from the form (the parser stops as soon as it has found them).
+        actionURL, values = self.parse(step, extractForm, content, ids=('state', 'code'))
+        state = values['state']
+        code = values['code']
 
         # Perform an API Gateway login.
-        response = self.requestsSession.post(url=actionURL, headers=MyEE.stealthyHeaders, data={'state':state, 'code':code}, allow_redirects=False)
+        response = self.request(step, self.requestsSession, 'POST', url=actionURL, headers=MyEE.stealthyHeaders, data={'state':state, 'code':code}, allow_redirects=False)
 
         try:
             # Python 3
@@ -91,83 +280,88 @@ class MyEE:
 
     def getSession(self):
         # First the client requests the My EE login page but gets sent to the API Gateway authorization page.
-        response = self.requestsSession.get(url='https://id.ee.co.uk/id/login', headers=MyEE.stealthyHeaders, allow_redirects=False)
+        response = self.request('eeIDLogin', self.requestsSession, 'GET', url=MyEE.eeIDHost + '/id/login', headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # We get an EE ID Web Session ID.
         self.EEIDWEBSESSIONID = response.cookies['EEIDWEBSESSIONID']
 
         # We perform the API Gateway authorize and get bounced to the Azure Active Directory B2C Auth login.
-        response = self.requestsSession.get(url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
+        response = self.request('apiGatewayAuthorize', self.requestsSession, 'GET', url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # Azure Active Directory B2C uses some cookies (https://learn.microsoft.com/en-us/azure/active-directory-b2c/cookie-definitions) which a Session object will automatically persist, also HTTP Keep-Alives will be enabled.
-        self.azureADSession = requests.Session()
+        self.azureADSession = self.createRequestsSession()
 
         # Get an Azure Active Directory B2C authorization code (see https://learn.microsoft.com/en-us/azure/active-directory-b2c/authorization-code-flow)
-        response = self.azureADSession.get(url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
+        response = self.request('azureB2CAuthorize', self.azureADSession, 'GET', url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # EE uses this special URL to validate a session.
         correlationText = re.search('^<!-- CorrelationId: (?P<CorrelationID>.*?) -->', response.text, flags=re.MULTILINE)
-        self.azureADSession.get(url=self.azureB2CHost + '/telemetry?c=' + correlationText.groups('CorrelationID')[0], headers=MyEE.stealthyHeaders, allow_redirects=False)
+        self.request('azureB2CTelemetry', self.azureADSession, 'GET', url=self.azureB2CHost + '/telemetry?c=' + correlationText.groups('CorrelationID')[0], headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # Get the latest SETTINGS JSON.
-        return self.extractSettingsJSON(response.text)
+        return self.parse('azureB2CAuthorize', self.extractSettingsJSON, response.text)
 
     def login(self, settingsJSON, username, password):
-        stealthyHeadersForm = MyEE.stealthyHeaders
+        import requests
+
+        # Take a copy so the CSRF token does not leak into the headers shared by every other MyEE object.
+        stealthyHeadersForm = dict(MyEE.stealthyHeaders)
         stealthyHeadersForm.update({'X-CSRF-TOKEN' : settingsJSON['csrf']})
 
         # We perform the Azure AD B2C login (Stage #1, https://learn.microsoft.com/en-us/azure/active-directory-b2c/self-asserted-technical-profile) and get a 200 (appears to be an MS bug where tx and csrf is not URL Encoded.. we faithfully replicate this).
-        response = self.azureADSession.post(url=self.azureB2CHost + settingsJSON['hosts']['tenant'] + '/SelfAsserted?tx=' + settingsJSON['transId'] + '&p=' + requests.utils.quote(settingsJSON['hosts']['policy']), headers=stealthyHeadersForm, data={'request_type':'RESPONSE', 'signInName':username}, allow_redirects=False)
+        response = self.request('azureB2CSelfAssertedUsername', self.azureADSession, 'POST', url=self.azureB2CHost + settingsJSON['hosts']['tenant'] + '/SelfAsserted?tx=' + settingsJSON['transId'] + '&p=' + requests.utils.quote(settingsJSON['hosts']['policy']), headers=stealthyHeadersForm, data={'request_type':'RESPONSE', 'signInName':username}, allow_redirects=False)
+        response.raise_for_status()
         if response.text != '{"status":"200"}': return False
 
         # Then we "confirm" our session.
-        response = self.azureADSession.get(url=self.azureB2CHost + settingsJSON['hosts']['tenant'] + '/api/' + settingsJSON['api'] + '/confirmed?csrf_token=' + settingsJSON['csrf'] + '&tx=' + settingsJSON['transId'] + '&p=' + requests.utils.quote(settingsJSON['hosts']['policy']), headers=MyEE.stealthyHeaders, allow_redirects=False)
+        response = self.request('azureB2CConfirmedUsername', self.azureADSession, 'GET', url=self.azureB2CHost + settingsJSON['hosts']['tenant'] + '/api/' + settingsJSON['api'] + '/confirmed?csrf_token=' + settingsJSON['csrf'] + '&tx=' + settingsJSON['transId'] + '&p=' + requests.utils.quote(settingsJSON['hosts']['policy']), headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # Get the latest updated SETTINGS JSON.
-        settingsJSON = self.extractSettingsJSON(response.text)
+        settingsJSON = self.parse('azureB2CConfirmedUsername', self.extractSettingsJSON, response.text)
 
         # Update the CSRF Token.
         stealthyHeadersForm.update({'X-CSRF-TOKEN' : settingsJSON['csrf']})
 
         # We perform the Azure AD B2C login (Stage #2, https://learn.microsoft.com/en-us/azure/active-directory-b2c/self-asserted-technical-profile) and get a 200 (appears to be a MS bug where tx and csrf is not URL Encoded.. we faithfully replicate this).
-        response = self.azureADSession.post(url=self.azureB2CHost + settingsJSON['hosts']['tenant'] + '/SelfAsserted?tx=' + settingsJSON['transId'] + '&p=' + requests.utils.quote(settingsJSON['hosts']['policy']), headers=stealthyHeadersForm, data={'request_type':'RESPONSE', 'signInName':username, 'password':password}, allow_redirects=False)
+        response = self.request('azureB2CSelfAssertedPassword', self.azureADSession, 'POST', url=self.azureB2CHost + settingsJSON['hosts']['tenant'] + '/SelfAsserted?tx=' + settingsJSON['transId'] + '&p=' + requests.utils.quote(settingsJSON['hosts']['policy']), headers=stealthyHeadersForm, data={'request_type':'RESPONSE', 'signInName':username, 'password':password}, allow_redirects=False)
+        response.raise_for_status()
         if response.text != '{"status":"200"}': return False
 
         # Then we "confirm" our session.
-        response = self.azureADSession.get(url=self.azureB2CHost + settingsJSON['hosts']['tenant'] + '/api/' + settingsJSON['api'] + '/confirmed?csrf_token=' + settingsJSON['csrf'] + '&tx=' + settingsJSON['transId'] + '&p=' + requests.utils.quote(settingsJSON['hosts']['policy']), headers=MyEE.stealthyHeaders, allow_redirects=False)
+        response = self.request('azureB2CConfirmedPassword', self.azureADSession, 'GET', url=self.azureB2CHost + settingsJSON['hosts']['tenant'] + '/api/' + settingsJSON['api'] + '/confirmed?csrf_token=' + settingsJSON['csrf'] + '&tx=' + settingsJSON['transId'] + '&p=' + requests.utils.quote(settingsJSON['hosts']['policy']), headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # Now perform an API Gateway login to EE ID.
-        callbackURL, self.OPBS, self.SID = self.loginToAPIGateway(response.text)
+        callbackURL, self.OPBS, self.SID = self.loginToAPIGateway(response.text, 'eeIDAPIGatewayLogin')
 
         # We request the EE ID Auth URL and get sent to the EE ID Dashboard.
-        response = self.requestsSession.get(url=callbackURL, headers=MyEE.stealthyHeaders, cookies={'EEIDWEBSESSIONID':self.EEIDWEBSESSIONID}, allow_redirects=False)
+        response = self.request('eeIDCallback', self.requestsSession, 'GET', url=callbackURL, headers=MyEE.stealthyHeaders, cookies={'EEIDWEBSESSIONID':self.EEIDWEBSESSIONID}, allow_redirects=False)
 
         # The EEIDWEBSESSIONID has changed now we are authenticated.
         self.EEIDWEBSESSIONID = response.cookies['EEIDWEBSESSIONID']
 
         # EE ID Dashboard redirects us to "MyAccount".
-        response = self.requestsSession.get(url=response.headers['Location'], headers=MyEE.stealthyHeaders, cookies={'EEIDWEBSESSIONID':self.EEIDWEBSESSIONID}, allow_redirects=False)
+        response = self.request('eeIDDashboard', self.requestsSession, 'GET', url=response.headers['Location'], headers=MyEE.stealthyHeaders, cookies={'EEIDWEBSESSIONID':self.EEIDWEBSESSIONID}, allow_redirects=False)
 
         # We request "myaccount.ee.co.uk/app" and get bounced to the "ee.co.uk/app".
-        response = self.requestsSession.get(url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
+        response = self.request('myAccountRedirect', self.requestsSession, 'GET', url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # We request the "ee.co.uk/app".
-        response = self.requestsSession.get(url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
+        response = self.request('myAccountApp', self.requestsSession, 'GET', url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # The MYACCOUNTSESSIONID has now been set.
         self.MyAccountSessionID = response.cookies['MYACCOUNTSESSIONID']
 
         # API Gateway authorize to "MyAccount".
-        response = self.requestsSession.get(url=response.headers['Location'], headers=MyEE.stealthyHeaders, cookies={'OPBS':self.OPBS, 'SID':self.SID}, allow_redirects=False)
+        response = self.request('myAccountAPIGatewayAuthorize', self.requestsSession, 'GET', url=response.headers['Location'], headers=MyEE.stealthyHeaders, cookies={'OPBS':self.OPBS, 'SID':self.SID}, allow_redirects=False)
 
         # Azure AD B2C Authorize again.
-        response = self.azureADSession.get(url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
+        response = self.request('myAccountAzureB2CAuthorize', self.azureADSession, 'GET', url=response.headers['Location'], headers=MyEE.stealthyHeaders, allow_redirects=False)
 
         # Login to API Gateway.
-        callbackURL, _, _ = self.loginToAPIGateway(response.text)
+        callbackURL, _, _ = self.loginToAPIGateway(response.text, 'myAccountAPIGatewayLogin')
 
         # "MyAccount" Authorize.
-        response = self.requestsSession.get(url=callbackURL, headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False)
+        response = self.request('myAccountCallback', self.requestsSession, 'GET', url=callbackURL, headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False)
 
         # This is the only cookie required for the My EE session.
         if 'MYACCOUNTSESSIONID' in response.cookies:
@@ -183,105 +377,359 @@ class MyEE:
             # The session cookie was not found. Login failed.
             return False
 
+    def getAPI(self, endpoint, params=None):
+        # Rarely changing end-points can be served from the response cache (but only once the active line is known, a new or resumed session may be on any line).
+        if self.responseCache and self.responseCache.isCacheable(endpoint):
+            if self.currentMSISDN is None and not self.lookedUpMSISDN: self.currentMSISDN = self.activeMSISDN()
+            if self.currentMSISDN is not None: return self.getCachedAPI(endpoint, params)
+
+        # Send the request to one of the "MyAccount" JSON API end-points.
+        response = self.request(endpoint, self.requestsSession, 'GET', url=MyEE.myAccountHost + MyEE.apiEndpoints[endpoint], params=params, headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False)
+        return self.parse(endpoint, response.json)
+
+    def activeMSISDN(self):
+        # The line the session is on (found with the one cheap request, which is never served from the response cache).
+        self.lookedUpMSISDN = True
+        response = self.request('activeMSISDN', self.requestsSession, 'GET', url=MyEE.myAccountHost + MyEE.apiEndpoints['basic'], headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False)
+        if response.status_code != 200: return None
+
+        return MyEE.extractMSISDN(self.parse('activeMSISDN', response.json))
+
+    @staticmethod
+    def extractMSISDN(responseJSON):
+        # The line a response is for (if it says).
+        return responseJSON.get('msisdn') if isinstance(responseJSON, dict) else None
+
+    def iterStreamedRecords(self, step, reader):
+        from shared.streaming import iterJSONRecords
+
+        # The body is decompressed and parsed as it arrives (so it is never held in memory all at once).
+        try:
+            for record in iterJSONRecords(reader):
+                yield record
+        finally:
+            # Stopping part way through only reads the rest of the body if it is small (otherwise the connection is closed).
+            self.recordStream(step, reader)
+            reader.close()
+
+    def recordStream(self, step, reader):
+        # A streamed body is only counted once it has been read (the bytes on the wire are before decompression and the time is spent waiting for it).
+        if self.instrumentation:
+            self.instrumentation.emit({'type':'stream', 'step':step, 'seconds':reader.readSeconds, 'bytes':reader.bytesRead, 'wireBytes':self.instrumentation.wireBytes(reader.response), 'timestamp':time.time()})
+
+    def parseStream(self, step, reader, function, *args, **kwargs):
+        # Like parse() but the time spent waiting for more of the body is counted as part of the request rather than the parse (and the rest of the body is only read if it is small).
+        startTime = time.perf_counter()
+
+        try:
+            return function(reader, *args, **kwargs)
+        finally:
+            reader.close()
+            self.recordStream(step, reader)
+
+            if self.instrumentation:
+                self.instrumentation.emit({'type':'parse', 'step':step, 'seconds':time.perf_counter() - startTime - reader.readSeconds, 'timestamp':time.time()})
+
+    def streamAPI(self, endpoint, params=None):
+        from shared.streaming import ResponseReader, jsonChunkSize
+
+        # Send the request to one of the "MyAccount" JSON API end-points (the response cache is not used as the body is never kept).
+        response = self.request(endpoint, self.requestsSession, 'GET', url=MyEE.myAccountHost + MyEE.apiEndpoints[endpoint], params=params, headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False, stream=True)
+        return self.iterStreamedRecords(endpoint, ResponseReader(response, jsonChunkSize))
+
+    def getCachedAPI(self, endpoint, params=None):
+        # Entries are specific to this account and the currently switched MSISDN.
+        cacheKey = self.responseCache.key(self.email, self.currentMSISDN, endpoint, params)
+        entry = self.responseCache.get(cacheKey)
+
+        # A fresh entry does not need a request at all.
+        if entry and self.responseCache.isFresh(entry):
+            self.responseCache.recordHit(entry)
+            return json.loads(entry['content'])
+
+        # An expired entry can be revalidated if the server gave us an ETag or Last-Modified date.
+        headers = dict(MyEE.stealthyHeaders)
+        if entry: headers.update(self.responseCache.conditionalHeaders(entry))
+
+        # Send the request to one of the "MyAccount" JSON API end-points.
+        response = self.request(endpoint, self.requestsSession, 'GET', url=MyEE.myAccountHost + MyEE.apiEndpoints[endpoint], params=params, headers=headers, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False)
+
+        # The cached copy is still current.
+        if entry and response.status_code == 304:
+            self.responseCache.refresh(cacheKey, endpoint)
+            self.responseCache.recordHit(entry, revalidated=True)
+            return json.loads(entry['content'])
+
+        self.responseCache.recordMiss()
+        responseJSON = self.parse(endpoint, response.json)
+
+        # The session was switched to another line under us (so nothing cached for the line we thought we were on can be trusted either).
+        responseMSISDN = MyEE.extractMSISDN(responseJSON)
+        if responseMSISDN is not None and responseMSISDN != self.currentMSISDN:
+            self.responseCache.invalidate(self.email, self.currentMSISDN)
+            self.currentMSISDN = responseMSISDN
+            return responseJSON
+
+        # Only successful responses are cached.
+        if response.status_code == 200: self.responseCache.storeResponse(cacheKey, endpoint, response)
+
+        return responseJSON
+
+    def batch(self, jobs):
+        # Group the (msisdn, endpoint) jobs by line (a None MSISDN is whichever line is currently active) without repeating any.
+        lines = collections.OrderedDict()
+        for msisdn, endpoint in jobs:
+            endpoints = lines.setdefault(msisdn, [])
+            if endpoint not in endpoints: endpoints.append(endpoint)
+
+        # The active line is read first so it does not need switching to.
+        if self.currentMSISDN in lines: lines.move_to_end(self.currentMSISDN, last=False)
+        if None in lines: lines.move_to_end(None, last=False)
+
+        # Each line is switched to (at most) once and all of its end-points are read together.
+        results = collections.OrderedDict()
+        for msisdn, endpoints in lines.items():
+            if msisdn is not None and not self.switchMSISDN(msisdn):
+                raise ValueError('Failed to switch to MSISDN ' + str(msisdn) + '.')
+
+            results[msisdn] = dict((endpoint, getattr(self, endpoint)()) for endpoint in endpoints)
+
+        return results
+
     def accountsummary(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/accountsummary', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('accountsummary')
 
     def addOnsAvailableData(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/add-ons-available-data', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('addOnsAvailableData')
 
     def alerts(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/alerts', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('alerts')
 
     def basic(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/basic', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('basic')
 
     def cTnPicker(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/ctnpicker', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('cTnPicker')
 
     def dataPassHistory(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/datapass-history', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('dataPassHistory')
 
     def extraChargesDetails(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/extra-charges-details', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('extraChargesDetails')
 
     def extraChargesTotal(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/extra-charges-total', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('extraChargesTotal')
 
     def familyGiftingAuth(self):
-        # Need to get the CSRF token.
-        response = self.requestsSession.get(url=MyEE.myAccountHost + '/plans-subscriptions/mobile/data-gifting', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False)
-
-        # We use BeautifulSoup to parse the returned HTML.
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Get a reference to the data gifting form (there is no ID to search for and this URL has actually moved).
-        giftDataForm = soup.find('form', {'action': '/app/family-gifting?fa=giftData'})
-
-        # Get the hidden HTML form CSRF Input value.
-        return giftDataForm.find(id='csrf').attrs['value']
-
-    def familyGiftingHistory(self, csrf):
+        # We only need a few values from the (X)HTML forms.
+        from shared.htmlforms import extractStreamedForm
+        from shared.streaming import ResponseReader, htmlChunkSize
+
+        # Need to get the CSRF token (the page is large so it is streamed).
+        response = self.request('familyGiftingAuth', self.requestsSession, 'GET', url=MyEE.myAccountHost + '/plans-subscriptions/mobile/data-gifting', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False, stream=True)
+        self.checkGiftingSession('familyGiftingAuth', response)
+
+        # Get the hidden HTML form CSRF Input value from the data gifting form (there is no ID to search for and this URL has actually moved), the rest of the page is only downloaded if it is small enough to keep the connection for the next data gifting request.
+        _, values = self.parseStream('familyGiftingAuth', ResponseReader(response, htmlChunkSize), extractStreamedForm, response.encoding, action='/app/family-gifting?fa=giftData', ids=('csrf',))
+
+        # Keep the token so the other data gifting requests do not need to load the page again.
+        self.giftingCSRFToken = values['csrf']
+        return self.giftingCSRFToken
+
+    def getGiftingCSRFToken(self):
+        # The data gifting page is only loaded when we do not already have a token.
+        return self.giftingCSRFToken or self.familyGiftingAuth()
+
+    @staticmethod
+    def isLoginRedirect(response):
+        # An expired session gets redirected back to the login page (the redirect may already have been followed).
+        return any(redirect.is_redirect and '/login' in redirect.headers.get('Location', '') for redirect in list(response.history) + [response])
+
+    def checkGiftingSession(self, step, response):
+        # An expired session is not a token problem (so it is raised for the session to be recovered rather than the request retried).
+        if MyEE.isLoginRedirect(response):
+            response.close()
+            raise SessionExpiredError('The My EE session has expired (the "' + step + '" request was redirected to the login page).')
+
+    def isGiftingRejected(self, response, expectJSON, reader=None):
+        # My EE refuses requests with an expired or invalid CSRF token.
+        if response.status_code in (401, 403, 419): return True
+
+        # Or it sends back a HTML page rather than the JSON (throttled and failed responses are returned as they are).
+        if response.status_code != 200 or not expectJSON: return False
+
+        # A streamed body is only peeked at (EE does not always set a JSON content type so the body itself has to be checked).
+        if reader: return reader.peek(64).lstrip().startswith(b'<')
+        return response.text.lstrip().startswith('<')
+
+    def familyGiftingRequest(self, step, operation, data, csrf, allow_redirects=False, expectJSON=True, stream=False):
+        from shared.streaming import ResponseReader, jsonChunkSize
+
+        # A caller supplied token is used as is (otherwise we use, and if necessary refresh, our own).
+        cachedToken = not csrf and self.giftingCSRFToken is not None
+        token = csrf or self.getGiftingCSRFToken()
+        response = self.request(step, self.requestsSession, 'POST', url=MyEE.myAccountHost + '/plans-subscriptions/mobile/data-gifting?fa=' + operation, headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, data=dict(data, csrf=token), allow_redirects=allow_redirects, stream=stream)
+        self.checkGiftingSession(step, response)
+        reader = ResponseReader(response, jsonChunkSize) if stream else None
+
+        # A token we had cached may have expired, so get a new one and try once more (a rejected request will not have done anything, and a token we have only just fetched cannot be stale).
+        if cachedToken and self.isGiftingRejected(response, expectJSON, reader):
+            response.close()
+            self.giftingCSRFToken = None
+            token = self.getGiftingCSRFToken()
+            response = self.request(step, self.requestsSession, 'POST', url=MyEE.myAccountHost + '/plans-subscriptions/mobile/data-gifting?fa=' + operation, headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, data=dict(data, csrf=token), allow_redirects=allow_redirects, stream=stream)
+            self.checkGiftingSession(step, response)
+            reader = ResponseReader(response, jsonChunkSize) if stream else None
+
+        # A streamed response is returned as a reader over its body (which keeps anything already peeked at).
+        return reader or response
+
+    def familyGiftingHistory(self, csrf=None):
         # Send the request (with the CSRF token).
-        return self.requestsSession.post(url=MyEE.myAccountHost + '/plans-subscriptions/mobile/data-gifting?fa=showMoreGiftingHistory', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, data={'csrf':csrf}, allow_redirects=False).json()
+        response = self.familyGiftingRequest('familyGiftingHistory', 'showMoreGiftingHistory', {}, csrf)
+        return self.parse('familyGiftingHistory', response.json)
 
-    def familyGiftingSubscriptionDataAllowance(self, csrf):
+    def iterFamilyGiftingHistory(self, csrf=None):
+        # Yield every data gifting history record as it is read (with the CSRF token).
+        reader = self.familyGiftingRequest('familyGiftingHistory', 'showMoreGiftingHistory', {}, csrf, stream=True)
+        return self.iterStreamedRecords('familyGiftingHistory', reader)
+
+    def familyGiftingSubscriptionDataAllowance(self, csrf=None):
         # Send the request (with the CSRF token).
-        return self.requestsSession.post(url=MyEE.myAccountHost + '/plans-subscriptions/mobile/data-gifting?fa=subscriptionDataAllowance', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, data={'csrf':csrf}, allow_redirects=False).json()
+        response = self.familyGiftingRequest('familyGiftingSubscriptionDataAllowance', 'subscriptionDataAllowance', {}, csrf)
+        return self.parse('familyGiftingSubscriptionDataAllowance', response.json)
 
-    def familyGifting(self, dataTransferMB, supplierCtn, consumerCtn, csrf):
+    def familyGifting(self, dataTransferMB, supplierCtn, consumerCtn, csrf=None):
         # Send the request (with the CSRF token).
-        response = self.requestsSession.post(url=MyEE.myAccountHost + '/plans-subscriptions/mobile/data-gifting?fa=giftData', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, data={'supplierCtn':supplierCtn, 'consumerCtn':consumerCtn, 'dataTransferMB':dataTransferMB, 'csrf':csrf}, allow_redirects=True)
+        response = self.familyGiftingRequest('familyGifting', 'giftData', {'supplierCtn':supplierCtn, 'consumerCtn':consumerCtn, 'dataTransferMB':dataTransferMB}, csrf, allow_redirects=True, expectJSON=False)
         return (response.status_code == 200 and ('Data Gifting successful' in response.text))
 
     def freeDataUsage(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/freedata-usage', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('freeDataUsage')
 
     def myAddressPayM(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/my-address-paym', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('myAddressPayM')
 
     def otherAllowances(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/other-allowances', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('otherAllowances')
 
     def paymentHistory(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/payment-history', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('paymentHistory')
+
+    def iterPaymentHistory(self):
+        # Yield every payment as it is read.
+        return self.streamAPI('paymentHistory')
 
     def planBill(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/plan-bill', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('planBill')
 
     def plansAndDevicesDetails(self, startPos=0, endPos=4):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/plans-and-devices-details?from=' + str(startPos) + '&to=' + str(endPos), headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MYACCOUNTSESSIONID}, allow_redirects=False).json()
+        return self.getAPI('plansAndDevicesDetails', {'from':startPos, 'to':endPos})
 
     def roles(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/roles', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('roles')
 
     def spendCap(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/spendcap', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
+        return self.getAPI('spendCap')
+
+    def switchMSISDN(self, switchMsisdn, force=False):
+        # There is no need to switch to the line we are already on (unless another process may have switched the shared session since).
+        if switchMsisdn == self.currentMSISDN and not force and not self.sharedSession: return True
 
-    def switchMSISDN(self, switchMsisdn):
         # Send the request (with the CSRF token).
-        response = self.requestsSession.post(url=MyEE.myAccountHost + '/app/api/switchmsisdn', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, data={'switchMsisdn':switchMsisdn, 'csrf':self.MyAccountCSRFToken}, allow_redirects=True)
-        return (response.status_code == 200 and ('Switch ctn successfully done.' in response.text))
+        response = self.request('switchMSISDN', self.requestsSession, 'POST', url=MyEE.myAccountHost + '/app/api/switchmsisdn', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, data={'switchMsisdn':switchMsisdn, 'csrf':self.MyAccountCSRFToken}, allow_redirects=True)
+        switched = (response.status_code == 200 and ('Switch ctn successfully done.' in response.text))
+
+        # The active MSISDN is tracked so redundant switches are skipped (and cached responses are keyed by it).
+        if switched: self.currentMSISDN = switchMsisdn
+
+        return switched
 
     def usageData(self, startPos=0, endPos=4):
         # Send the request (although this API does not appear to list details on which subscription each item is for).
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/usagedata?from=' + str(startPos) + '&to=' + str(endPos), headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MYACCOUNTSESSIONID}, allow_redirects=False).json()
+        return self.getAPI('usageData', {'from':startPos, 'to':endPos})
+
+    @staticmethod
+    def extractRecords(responseJSON):
+        # The records are either the whole response or the first list within it.
+        if isinstance(responseJSON, list):
+            return responseJSON
+        elif isinstance(responseJSON, dict):
+            return next((value for value in responseJSON.values() if isinstance(value, list)), [])
+        else:
+            return []
+
+    def iterPages(self, pageFunction, pageSize, prefetch, maxPages=1000):
+        import concurrent.futures
+
+        # Asking for pages of no records would never get anywhere.
+        if pageSize < 1:
+            raise ValueError('The page size must be at least 1 (not ' + str(pageSize) + ').')
+
+        # The next page is downloaded on a background thread while the current one is being processed.
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        def fetchPage(startPos):
+            # The end position is inclusive (the end-points' own defaults of 0 to 4 are 5 records).
+            if executor: return executor.submit(pageFunction, startPos, startPos + pageSize - 1)
+
+            # Without prefetching the page is downloaded now.
+            future = concurrent.futures.Future()
+            future.set_result(pageFunction(startPos, startPos + pageSize - 1))
+            return future
+
+        try:
+            startPos = 0
+            page = fetchPage(startPos)
+            previousRecords = None
+
+            for _ in range(maxPages):
+                records = MyEE.extractRecords(page.result())
+
+                # Only an empty page is the last page (the server may return fewer records than were asked for), and a server that ignores the positions would repeat the same page forever.
+                if not records or records == previousRecords: return
+
+                # The next page starts after the records actually returned.
+                startPos += len(records)
+                page = fetchPage(startPos)
+                previousRecords = records
+
+                for record in records:
+                    yield record
+
+            raise ValueError('Gave up after ' + str(maxPages) + ' pages (the end of the records was never reached).')
+        finally:
+            # Do not wait for a page the caller no longer wants.
+            if executor: executor.shutdown(wait=False)
+
+    def iterPlansAndDevices(self, pageSize=5, prefetch=True, maxPages=1000):
+        # Yield every plan and device, a page at a time.
+        return self.iterPages(self.plansAndDevicesDetails, pageSize, prefetch, maxPages)
+
+    def iterUsageData(self, pageSize=5, prefetch=True, maxPages=1000):
+        # Yield every usage record, a page at a time.
+        return self.iterPages(self.usageData, pageSize, prefetch, maxPages)
+
+    def iterUsageDetails(self):
+        # Yield every usage detail as it is read.
+        return self.streamAPI('usageDetails')
 
     def usageDetails(self):
         # Send the request.
-        return self.requestsSession.get(url=MyEE.myAccountHost + '/app/api/usage-details', headers=MyEE.stealthyHeaders, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False).json()
\ No newline at end of file
+        return self.getAPI('usageDetails')
\ No newline at end of file
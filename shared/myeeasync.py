@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The async client runs many requests concurrently on the one event loop.
+import asyncio
+
+# Third party library to make asynchronous HTTP(S) requests; "pip install aiohttp" if getting import errors.
+import aiohttp
+
+# The login handshake and end-points are shared with the synchronous client.
+from shared.myee import MyEE
+
+class AsyncMyEE:
+
+    # By default a snapshot fetches every "MyAccount" JSON API end-point.
+    snapshotEndpoints = tuple(MyEE.apiEndpoints)
+
+    def __init__(self, session, maxConcurrency=10):
+        # The session cookies from an already logged in My EE session (see MyEE.exportSession()).
+        self.MyAccountSessionID = session['MyAccountSessionID']
+        self.MyAccountCSRFToken = session['MyAccountCSRFToken']
+
+        # Limits how many requests are in flight at once (EE does not take kindly to being flooded).
+        self.semaphore = asyncio.Semaphore(maxConcurrency)
+
+        # A pooled client with keep-alives but no cookie persistence (EE clutters requests with a LOT of cookies).
+        self.clientSession = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=maxConcurrency), cookie_jar=aiohttp.DummyCookieJar(), headers=MyEE.stealthyHeaders)
+
+    @classmethod
+    async def login(cls, email, password, sessionCache=None, maxConcurrency=10):
+        # The login handshake is strictly sequential so we re-use the synchronous client's implementation (on a worker thread so the event loop is not blocked).
+        myEE = await asyncio.get_running_loop().run_in_executor(None, MyEE, email, password, sessionCache)
+
+        # Continue the same session asynchronously.
+        return cls(myEE.exportSession(), maxConcurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType, excValue, traceback):
+        await self.close()
+
+    async def close(self):
+        # Close all the pooled connections.
+        await self.clientSession.close()
+
+    async def getAPI(self, endpoint, params=None):
+        # Wait for a free slot then send the request to one of the "MyAccount" JSON API end-points.
+        async with self.semaphore:
+            async with self.clientSession.get(url=MyEE.myAccountHost + MyEE.apiEndpoints[endpoint], params=params, cookies={'MYACCOUNTSESSIONID':self.MyAccountSessionID}, allow_redirects=False) as response:
+                # An expired session gets redirected back to the login page (with an empty body rather than the JSON).
+                if response.status != 200:
+                    raise ValueError('Unexpected HTTP ' + str(response.status) + ' from the "' + endpoint + '" end-point (has the session expired?).')
+
+                # EE does not always set a JSON content type.
+                return await response.json(content_type=None)
+
+    async def gatherSnapshot(self, endpoints=None):
+        # Fetch all the end-points at once (so a snapshot takes roughly as long as the slowest request).
+        endpoints = list(endpoints or AsyncMyEE.snapshotEndpoints)
+        results = await asyncio.gather(*[getattr(self, endpoint)() for endpoint in endpoints])
+
+        # Key each result by the end-point it came from.
+        return dict(zip(endpoints, results))
+
+    async def plansAndDevicesDetails(self, startPos=0, endPos=4):
+        # Send the request.
+        return await self.getAPI('plansAndDevicesDetails', {'from':startPos, 'to':endPos})
+
+    async def usageData(self, startPos=0, endPos=4):
+        # Send the request.
+        return await self.getAPI('usageData', {'from':startPos, 'to':endPos})
+
+def addAPIMethod(endpoint):
+    # Each end-point without any parameters gets a coroutine method with the same name as the synchronous client.
+    async def apiMethod(self):
+        # Send the request.
+        return await self.getAPI(endpoint)
+
+    apiMethod.__name__ = endpoint
+    setattr(AsyncMyEE, endpoint, apiMethod)
+
+for endpoint in MyEE.apiEndpoints:
+    if not hasattr(AsyncMyEE, endpoint): addAPIMethod(endpoint)
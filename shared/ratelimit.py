@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The limiter is shared by all the worker threads.
+import threading
+import time
+
+try:
+    # Python 3
+    from urllib.parse import urlparse
+except ImportError:
+    # Python 2
+    from urlparse import urlparse
+
+# Third party library to make HTTP(S) requests; "pip install requests" if getting import errors.
+import requests
+
+class TokenBucket:
+
+    def __init__(self, rate, burst=1):
+        # Tokens are added at "rate" per second up to a maximum of "burst".
+        self.rate = float(rate)
+        self.burst = float(burst)
+
+        # The bucket starts full.
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                # Top up the bucket for the time that has passed.
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + ((now - self.updated) * self.rate))
+                self.updated = now
+
+                # Take a token if there is one.
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                # Otherwise work out how long until there will be one.
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+class RateLimiter:
+
+    def __init__(self, rate, burst=1):
+        # Every host gets its own bucket with the same limits.
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        # Block until a request can be sent to this URL's host.
+        self.bucket(urlparse(url).netloc).acquire()
+
+class RateLimitedAdapter(requests.adapters.HTTPAdapter):
+
+    def __init__(self, rateLimiter, **kwargs):
+        self.rateLimiter = rateLimiter
+        super(RateLimitedAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        # Wait our turn before every request (including each manually followed redirect).
+        self.rateLimiter.acquire(request.url)
+        return super(RateLimitedAdapter, self).send(request, **kwargs)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The least recently used entries are evicted first.
+import collections
+
+# We never store the account e-mail address in a cache key.
+import hashlib
+
+# The cache can optionally be saved to disk as JSON.
+import json
+import os
+
+# The cache may be shared by several threads.
+import threading
+import time
+
+class ResponseCache:
+
+    # How long (in seconds) each rarely changing end-point is cached for; end-points not listed are never cached.
+    defaultTTLs = {
+        'accountsummary': 300,
+        'cTnPicker': 3600,
+        'myAddressPayM': 86400,
+        'planBill': 3600,
+        'roles': 3600
+    }
+
+    def __init__(self, ttls=None, maxEntries=256, maxBytes=4 * 1024 * 1024, path=None):
+        # The time to live of each end-point.
+        self.ttls = dict(ResponseCache.defaultTTLs if ttls is None else ttls)
+
+        # The cache is bounded both by the number of responses and their total size.
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.totalBytes = 0
+
+        # Entries are kept in least recently used order.
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        # How useful the cache has been.
+        self.statistics = {'hits':0, 'misses':0, 'revalidations':0, 'bytesSaved':0}
+
+        # (Optional) The file the cache is loaded from and saved to.
+        self.path = path
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'r') as in_file:
+                for key, entry in json.load(in_file):
+                    self.store(key, entry)
+
+    def isCacheable(self, endpoint):
+        return endpoint in self.ttls
+
+    def key(self, account, msisdn, endpoint, params=None):
+        # Responses are scoped to the account and the currently switched MSISDN so one line's data is never returned for another.
+        return self.linePrefix(account, msisdn) + endpoint + '|' + '&'.join(str(name) + '=' + str(value) for name, value in sorted((params or {}).items()))
+
+    def linePrefix(self, account, msisdn):
+        # The start of every key for this account's line.
+        accountHash = hashlib.sha256(account.strip().lower().encode('utf-8')).hexdigest()[:16]
+        return accountHash + '|' + str(msisdn or '') + '|'
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            # This entry is now the most recently used.
+            if entry: self.entries.move_to_end(key)
+
+            return entry
+
+    def isFresh(self, entry):
+        return entry['expires'] > time.time()
+
+    def store(self, key, entry):
+        with self.lock:
+            # Replace any existing entry.
+            if key in self.entries:
+                self.totalBytes -= self.entries.pop(key)['size']
+
+            # Responses bigger than the whole cache are not worth keeping.
+            if entry['size'] > self.maxBytes: return
+
+            self.entries[key] = entry
+            self.totalBytes += entry['size']
+
+            # Evict the least recently used entries until we are back within the limits.
+            while len(self.entries) > self.maxEntries or self.totalBytes > self.maxBytes:
+                _, evictedEntry = self.entries.popitem(last=False)
+                self.totalBytes -= evictedEntry['size']
+
+    def storeResponse(self, key, endpoint, response):
+        # The validators let an expired entry be revalidated with a conditional request.
+        self.store(key, {'expires':time.time() + self.ttls[endpoint], 'etag':response.headers.get('ETag'), 'lastModified':response.headers.get('Last-Modified'), 'content':response.text, 'size':len(response.content)})
+
+    def refresh(self, key, endpoint):
+        # The server confirmed the entry has not changed so it is good for another TTL.
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry: entry['expires'] = time.time() + self.ttls[endpoint]
+
+    def conditionalHeaders(self, entry):
+        headers = {}
+
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+
+        return headers
+
+    def recordHit(self, entry, revalidated=False):
+        with self.lock:
+            self.statistics['revalidations' if revalidated else 'hits'] += 1
+            self.statistics['bytesSaved'] += entry['size']
+
+    def recordMiss(self):
+        with self.lock:
+            self.statistics['misses'] += 1
+
+    def hitRatio(self):
+        # Revalidated responses still save downloading the body.
+        lookups = self.statistics['hits'] + self.statistics['revalidations'] + self.statistics['misses']
+        return ((self.statistics['hits'] + self.statistics['revalidations']) / float(lookups)) if lookups else 0.0
+
+    def invalidate(self, account, msisdn):
+        # Forget every response cached for this account's line.
+        prefix = self.linePrefix(account, msisdn)
+
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                self.totalBytes -= self.entries.pop(key)['size']
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.totalBytes = 0
+
+    def save(self):
+        if not self.path: return
+
+        with self.lock:
+            entries = list(self.entries.items())
+
+        # The responses contain personal details so only we can read the file (and a reader never sees a half written cache).
+        temporaryPath = self.path + '.tmp'
+        out_file = os.fdopen(os.open(temporaryPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w')
+        with out_file:
+            json.dump(entries, out_file)
+
+        os.replace(temporaryPath, self.path)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Jobs are spread out by a random amount so many daemons do not all hit EE at once.
+import random
+
+# The scheduler runs on its own thread.
+import threading
+import time
+
+# Schedules are worked out in local time (like cron).
+from datetime import datetime, timedelta
+
+class CronSchedule:
+
+    # The minute, hour, day of month, month and day of week fields (and their allowed ranges, Sunday is 0 or 7).
+    fieldRanges = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = expression.split()
+
+        if len(fields) != 5:
+            raise ValueError('A cron schedule needs 5 fields (minute hour day month weekday), got "' + expression + '".')
+
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [CronSchedule.parseField(field, minimum, maximum) for field, (minimum, maximum) in zip(fields, CronSchedule.fieldRanges)]
+
+        # Sunday can be written as 0 or 7.
+        if 7 in self.weekdays:
+            self.weekdays.discard(7)
+            self.weekdays.add(0)
+
+        # Like cron, when both the day of month and day of week are restricted a day matching either will do.
+        self.anyDay = fields[2] == '*'
+        self.anyWeekday = fields[4] == '*'
+
+    @staticmethod
+    def parseField(field, minimum, maximum):
+        values = set()
+
+        for part in field.split(','):
+            # An optional step (e.g. "*/15" or "0-30/5").
+            rangeText, _, stepText = part.partition('/')
+            step = int(stepText) if stepText else 1
+
+            if rangeText == '*':
+                start, end = minimum, maximum
+            elif '-' in rangeText:
+                start, end = [int(value) for value in rangeText.split('-', 1)]
+            else:
+                start = int(rangeText)
+                end = maximum if stepText else start
+
+            if start < minimum or end > maximum or start > end or step < 1:
+                raise ValueError('Invalid cron field "' + field + '".')
+
+            values.update(range(start, end + 1, step))
+
+        return values
+
+    def isDayMatch(self, moment):
+        dayMatches = moment.day in self.days
+        weekdayMatches = ((moment.weekday() + 1) % 7) in self.weekdays
+
+        if self.anyDay or self.anyWeekday:
+            return dayMatches and weekdayMatches
+
+        return dayMatches or weekdayMatches
+
+    def nextRun(self, after):
+        # The first whole minute after "after" that matches the schedule.
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+
+        while moment < limit:
+            # Skip whole months, days and hours that cannot match.
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self.isDayMatch(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+
+        raise ValueError('The cron schedule "' + self.expression + '" never runs.')
+
+class Scheduler:
+
+    def __init__(self):
+        self.jobs = []
+        self.lock = threading.Lock()
+        self.stopEvent = threading.Event()
+
+    def addJob(self, name, schedule, function, jitterSeconds=0):
+        # The job is run at each time the cron schedule matches plus up to "jitterSeconds" of random delay.
+        job = {'name':name, 'schedule':CronSchedule(schedule), 'function':function, 'jitterSeconds':jitterSeconds, 'runs':0, 'failures':0, 'lastRun':None, 'lastDuration':None, 'lastResult':None, 'lastError':None}
+        self.scheduleNextRun(job, datetime.now())
+
+        with self.lock:
+            self.jobs.append(job)
+
+        return job
+
+    def scheduleNextRun(self, job, after):
+        job['nextRun'] = job['schedule'].nextRun(after)
+        job['nextRunTime'] = time.mktime(job['nextRun'].timetuple()) + random.uniform(0, job['jitterSeconds'])
+
+    def runJob(self, job):
+        startTime = time.time()
+
+        try:
+            # Whatever the job returns is kept for the status.
+            job['lastResult'] = job['function']()
+            job['lastError'] = None
+        except Exception as exception:
+            # A failing job should not stop the scheduler (or the other jobs).
+            job['failures'] += 1
+            job['lastError'] = repr(exception)
+
+        job['runs'] += 1
+        job['lastRun'] = startTime
+        job['lastDuration'] = round(time.time() - startTime, 3)
+
+    def runPending(self):
+        now = time.time()
+
+        with self.lock:
+            dueJobs = [job for job in self.jobs if job['nextRunTime'] <= now]
+
+        for job in dueJobs:
+            self.runJob(job)
+            self.scheduleNextRun(job, datetime.now())
+
+    def run(self, interval=1):
+        # Keep running the jobs as they become due until stopped.
+        while not self.stopEvent.is_set():
+            self.runPending()
+            self.stopEvent.wait(interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='Scheduler')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stopEvent.set()
+
+    def status(self):
+        # The state of every job (without the functions themselves).
+        with self.lock:
+            return [{'name':job['name'], 'schedule':job['schedule'].expression, 'runs':job['runs'], 'failures':job['failures'], 'lastRun':job['lastRun'], 'lastDuration':job['lastDuration'], 'lastResult':job['lastResult'], 'lastError':job['lastError'], 'nextRun':job['nextRunTime']} for job in self.jobs]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We never store the account e-mail address in a filename.
+import hashlib
+
+# The session cookies are stored as JSON.
+import json
+
+# We need to create files with restricted permissions.
+import os
+
+# Only one process should log an account in at a time.
+import contextlib
+
+try:
+    # Unix.
+    import fcntl
+except ImportError:
+    # Windows.
+    fcntl = None
+    import msvcrt
+
+class SessionCache:
+
+    # These are the only values needed to resume a logged in My EE session.
+    sessionKeys = ('MyAccountSessionID', 'MyAccountCSRFToken', 'OPBS', 'SID', 'EEIDWEBSESSIONID')
+
+    def __init__(self, directory):
+        # Each account gets its own file in this directory.
+        self.directory = directory
+
+        # Nobody else on the machine should be able to see the directory contents.
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, 0o700)
+
+        # How useful the cache has been to this process.
+        self.statistics = {'hits':0, 'misses':0, 'refreshes':0}
+
+    def sessionPath(self, email, extension='.json'):
+        # E-mail addresses are case insensitive and should not leak into the filesystem.
+        accountHash = hashlib.sha256(email.strip().lower().encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, accountHash + extension)
+
+    @contextlib.contextmanager
+    def lock(self, email):
+        # The lock is held on a separate file so that the session file itself can be safely replaced.
+        lockFile = os.open(self.sessionPath(email, '.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+
+        try:
+            if fcntl:
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(lockFile, msvcrt.LK_LOCK, 1)
+
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lockFile, fcntl.LOCK_UN)
+            else:
+                os.lseek(lockFile, 0, os.SEEK_SET)
+                msvcrt.locking(lockFile, msvcrt.LK_UNLCK, 1)
+
+            os.close(lockFile)
+
+    def load(self, email):
+        try:
+            with open(self.sessionPath(email), 'r') as in_file:
+                session = json.load(in_file)
+        except (IOError, OSError, ValueError):
+            # There is no (readable) cached session for this account.
+            return None
+
+        # A session with any missing values cannot be resumed.
+        if not all(session.get(key) for key in SessionCache.sessionKeys):
+            return None
+
+        return session
+
+    def save(self, email, session):
+        sessionPath = self.sessionPath(email)
+        temporaryPath = sessionPath + '.tmp'
+
+        # Write to a temporary file (only readable by us) first so a reader never sees a half written session.
+        out_file = os.fdopen(os.open(temporaryPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w')
+        with out_file:
+            json.dump(dict((key, session[key]) for key in SessionCache.sessionKeys), out_file)
+
+        os.replace(temporaryPath, sessionPath)
+
+    def delete(self, email):
+        try:
+            os.remove(self.sessionPath(email))
+        except OSError:
+            pass
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Without ijson a streamed response is still parsed (just not incrementally).
+import json
+
+# The time spent waiting for each chunk is counted separately from the time spent parsing it.
+import time
+
+# How much of a streamed JSON body is read at a time (and how little of a HTML page is read before looking for the form).
+jsonChunkSize = 64 * 1024
+htmlChunkSize = 8 * 1024
+
+# How much of a body that is no longer needed is still read (so its keep-alive connection can be re-used by the next request), 0 always drops the connection instead.
+drainLimit = 64 * 1024
+
+# The content encodings requested (worked out once, brotli is only asked for when it can be decoded).
+contentEncodings = None
+
+def acceptEncoding():
+    global contentEncodings
+
+    if contentEncodings is None:
+        try:
+            # Third party library to decode brotli; "pip install brotli" if you want brotli compressed responses.
+            import brotli
+            contentEncodings = 'gzip, deflate, br'
+        except ImportError:
+            try:
+                # The CFFI version of the same library (which urllib3 also supports).
+                import brotlicffi
+                contentEncodings = 'gzip, deflate, br'
+            except ImportError:
+                contentEncodings = 'gzip, deflate'
+
+    return contentEncodings
+
+class ResponseReader:
+
+    def __init__(self, response, chunkSize):
+        # A file-like object over a streamed response's (decompressed) body that counts how many bytes have been read and how long was spent waiting for them.
+        self.response = response
+        self.chunks = response.iter_content(chunkSize)
+        self.buffer = b''
+        self.bytesRead = 0
+        self.readSeconds = 0.0
+
+    def nextChunk(self):
+        # The next chunk (or None at the end of the body), timed as this is where the network is waited on.
+        startTime = time.perf_counter()
+        try:
+            return next(self.chunks, None)
+        finally:
+            self.readSeconds += time.perf_counter() - startTime
+
+    def fill(self, size):
+        # Only as many chunks as are needed are read.
+        while size < 0 or len(self.buffer) < size:
+            chunk = self.nextChunk()
+            if chunk is None: break
+            self.buffer += chunk
+
+    def peek(self, size):
+        # The start of what is left to read (without reading it).
+        self.fill(size)
+        return self.buffer[:size]
+
+    def read(self, size=-1):
+        self.fill(size)
+
+        if size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+
+        self.bytesRead += len(data)
+        return data
+
+    def __iter__(self):
+        # The chunks can also be read as they are (when their size does not matter), starting with anything already peeked at.
+        chunk, self.buffer = self.buffer, b''
+
+        while chunk is not None:
+            self.bytesRead += len(chunk)
+            if chunk: yield chunk
+            chunk = self.nextChunk()
+
+    def remainingWireBytes(self):
+        # How much of the body is still to come on the wire (None when the server did not say).
+        try:
+            return int(self.response.headers['Content-Length']) - self.response.raw.tell()
+        except (KeyError, ValueError, AttributeError):
+            return None
+
+    def isDrainable(self):
+        # A small remainder (or a compressed body of unknown length) costs less to read than a new TCP and TLS connection for the next request.
+        remaining = self.remainingWireBytes()
+        if remaining is None: return drainLimit > 0 and self.response.headers.get('Content-Encoding', 'identity') != 'identity'
+        return remaining <= drainLimit
+
+    def close(self):
+        # The rest of a small body is read (without decompressing it) and thrown away so the connection goes back to the pool.
+        if self.isDrainable():
+            startTime = time.perf_counter()
+            try:
+                self.response.raw.drain_conn()
+                self.response.raw.release_conn()
+                return
+            except AttributeError:
+                pass
+            finally:
+                self.readSeconds += time.perf_counter() - startTime
+
+        # Closing part way through a larger body drops the connection rather than reading the rest of it.
+        self.response.close()
+
+def iterJSONRecords(reader):
+    # The same records as MyEE.extractRecords() would return (the whole response or the first list within it) but one at a time.
+    try:
+        # Third party library to parse JSON incrementally; "pip install ijson" if you want large responses parsed as they are read.
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if not ijson:
+        # The whole body is parsed at once (the records are still only returned one at a time).
+        responseJSON = json.loads(reader.read().decode('utf-8'))
+
+        if isinstance(responseJSON, dict): responseJSON = next((value for value in responseJSON.values() if isinstance(value, list)), [])
+        if not isinstance(responseJSON, list): return
+
+        for record in responseJSON:
+            yield record
+        return
+
+    # Invalid JSON is reported the same way as the json module reports it.
+    try:
+        # A top level list is by far the quickest to read (ijson builds each record itself).
+        if reader.peek(64).lstrip()[:1] == b'[':
+            for record in ijson.items(reader, 'item', buf_size=jsonChunkSize, use_float=True):
+                yield record
+            return
+
+        events = ijson.parse(reader, buf_size=jsonChunkSize, use_float=True)
+
+        # Find where the records start (the top level list or the first list directly inside the top level object).
+        for prefix, event, value in events:
+            if event == 'start_array' and '.' not in prefix:
+                break
+            if prefix == '' and event not in ('start_map', 'map_key', 'end_map'):
+                return
+        else:
+            return
+
+        # Build each record from its events (a list's items all come before its own end_array).
+        builder = None
+        depth = 0
+        for prefix, event, value in events:
+            if builder is None:
+                if event == 'end_array': return
+                builder = ijson.ObjectBuilder()
+
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+
+            # The record is complete (scalar records are complete straight away).
+            if depth == 0:
+                yield builder.value
+                builder = None
+    except ijson.JSONError as exception:
+        raise ValueError('Invalid JSON in the response (' + str(exception) + ').')
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Retries are spread out by a random amount so many clients do not all retry at once.
+import random
+
+# The transport is shared by all the worker threads.
+import threading
+import time
+
+try:
+    # Python 3
+    from urllib.parse import urlparse
+except ImportError:
+    # Python 2
+    from urlparse import urlparse
+
+# Third party library to make HTTP(S) requests; "pip install requests" if getting import errors.
+import requests
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    # Raised instead of sending a request to a host that keeps failing.
+    pass
+
+class ThrottledError(requests.exceptions.HTTPError):
+    # Raised instead of returning a throttled or failed response to a request that cannot be sent again (so its caller does not try to parse the error page).
+    pass
+
+class CircuitBreaker:
+
+    def __init__(self, failureThreshold=5, resetTimeout=30):
+        # The circuit opens after "failureThreshold" failures in a row and lets a trial request through after "resetTimeout" seconds.
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+
+        self.state = 'closed'
+        self.failures = 0
+        self.openedAt = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+
+            # Only the one trial request is let through once the host has had time to recover.
+            if self.state == 'open' and time.monotonic() - self.openedAt >= self.resetTimeout:
+                self.state = 'half-open'
+                return True
+
+            return False
+
+    def recordSuccess(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def recordFailure(self):
+        with self.lock:
+            self.failures += 1
+
+            # A failed trial request (or too many failures in a row) opens the circuit again.
+            if self.state == 'half-open' or self.failures >= self.failureThreshold:
+                self.state = 'open'
+                self.openedAt = time.monotonic()
+
+class AdaptiveLimit:
+
+    def __init__(self, initial=4, maximum=16):
+        # How many requests may be in flight at once (raised by one per round of successes and halved on every throttled response).
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.inFlight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.inFlight >= int(self.limit):
+                self.condition.wait()
+
+            self.inFlight += 1
+
+    def release(self, throttled):
+        with self.condition:
+            self.inFlight -= 1
+
+            # Additive increase, multiplicative decrease (like TCP congestion control).
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.maximum), self.limit + (1.0 / self.limit))
+
+            self.condition.notify_all()
+
+class Transport:
+
+    # Only these methods are safe to send again.
+    idempotentMethods = ('GET', 'HEAD', 'OPTIONS')
+
+    # The responses that mean the host is overloaded (or briefly unavailable).
+    throttledStatuses = (429, 500, 502, 503, 504)
+
+    # The responses that mean the request was not processed at all (so any request can be sent again).
+    unprocessedStatuses = (429,)
+
+    def __init__(self, rateLimiter=None, maxRetries=3, backoffBase=0.5, backoffMax=30, failureThreshold=5, resetTimeout=30, initialConcurrency=4, maxConcurrency=16, loginAttempts=3):
+        # (Optional) Requests to each host are also throttled by a token bucket.
+        self.rateLimiter = rateLimiter
+
+        # Idempotent requests are retried with exponential backoff (and the whole login is restarted when a step of it fails).
+        self.maxRetries = maxRetries
+        self.backoffBase = backoffBase
+        self.backoffMax = backoffMax
+        self.loginAttempts = loginAttempts
+
+        # Every host gets its own circuit breaker and concurrency limit.
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.initialConcurrency = initialConcurrency
+        self.maxConcurrency = maxConcurrency
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+        # How hard the transport has had to work.
+        self.statistics = {'requests':0, 'retries':0, 'throttled':0, 'errors':0, 'rejected':0, 'loginRestarts':0}
+
+    def host(self, url):
+        host = urlparse(url).netloc
+
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = (CircuitBreaker(self.failureThreshold, self.resetTimeout), AdaptiveLimit(self.initialConcurrency, self.maxConcurrency))
+            return self.hosts[host]
+
+    def count(self, statistic):
+        with self.lock:
+            self.statistics[statistic] += 1
+
+    def backoff(self, attempt, retryAfter=None):
+        # Honour the server's own Retry-After (in seconds) otherwise wait a random time up to an exponentially growing maximum ("full jitter").
+        try:
+            if retryAfter is not None:
+                return min(self.backoffMax, max(0.0, float(retryAfter)))
+        except ValueError:
+            pass
+
+        return random.uniform(0, min(self.backoffMax, self.backoffBase * (2 ** attempt)))
+
+    def send(self, adapterSend, request, **kwargs):
+        circuitBreaker, adaptiveLimit = self.host(request.url)
+        attempt = 0
+
+        while True:
+            # Do not hammer a host that keeps failing.
+            if not circuitBreaker.allow():
+                self.count('rejected')
+                raise CircuitOpenError('Too many failures from ' + urlparse(request.url).netloc + ' (no requests are sent to it for ' + str(self.resetTimeout) + 's).', request=request)
+
+            if self.rateLimiter:
+                self.rateLimiter.acquire(request.url)
+
+            adaptiveLimit.acquire()
+            self.count('requests')
+
+            response = None
+            error = None
+            try:
+                response = adapterSend(request, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exception:
+                error = exception
+            finally:
+                # The slot is always given back (otherwise every later request to this host would wait for it forever).
+                throttled = response is None or response.status_code in Transport.throttledStatuses
+                adaptiveLimit.release(throttled and (response is not None or error is not None))
+
+                # Anything else (e.g. an invalid URL or header) is raised as is but still counts as a failure (so a half-open circuit is not left waiting for its trial request).
+                if response is None and error is None:
+                    circuitBreaker.recordFailure()
+                    self.count('errors')
+
+            if not throttled:
+                circuitBreaker.recordSuccess()
+                return response
+
+            circuitBreaker.recordFailure()
+            self.count('errors' if response is None else 'throttled')
+
+            # A request that was not processed can always be sent again (but a failed one may have been part way through it).
+            idempotent = request.method in Transport.idempotentMethods
+            retryable = idempotent or (response is not None and response.status_code in Transport.unprocessedStatuses)
+
+            # Give up once out of retries (or if sending the request again could repeat its effects).
+            if attempt >= self.maxRetries or not retryable:
+                if response is None: raise error
+                if idempotent: return response
+
+                # Read the rest of the failed response so its connection can be re-used.
+                response.content
+                response.close()
+                raise ThrottledError('HTTP ' + str(response.status_code) + ' from ' + urlparse(request.url).netloc + ' for a ' + request.method + ' request' + (' (after ' + str(attempt) + ' retries).' if retryable else ' (which is not sent again in case it was processed).'), request=request, response=response)
+
+            # Read the rest of the failed response so its connection can be re-used, then wait and try again.
+            if response is not None:
+                response.content
+                response.close()
+
+            time.sleep(self.backoff(attempt, response.headers.get('Retry-After') if response is not None else None))
+            attempt += 1
+            self.count('retries')
+
+    def status(self):
+        # The state of each host's circuit breaker and concurrency limit.
+        with self.lock:
+            return dict((host, {'circuit':circuitBreaker.state, 'concurrency':round(adaptiveLimit.limit, 2)}) for host, (circuitBreaker, adaptiveLimit) in self.hosts.items())
+
+class TransportAdapter(requests.adapters.HTTPAdapter):
+
+    def __init__(self, transport, **kwargs):
+        self.transport = transport
+        super(TransportAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        # Every request (including each manually followed redirect) goes through the transport.
+        return self.transport.send(super(TransportAdapter, self).send, request, **kwargs)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of MyEE-API <https://github.com/Matthew1471/MyEE-API>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The jobs and the keep-alives may run on different threads.
+import contextlib
+import threading
+import time
+
+# All the shared functions are in this package.
+from shared.myee import MyEE
+
+class WarmSession:
+
+    def __init__(self, email, password, sessionCache=None, rateLimiter=None, responseCache=None, instrumentation=None, transport=None, maxSessionAge=3600):
+        self.email = email
+        self.password = password
+        self.sessionCache = sessionCache
+        self.rateLimiter = rateLimiter
+        self.responseCache = responseCache
+        self.instrumentation = instrumentation
+        self.transport = transport
+
+        # Sessions are renewed after this many seconds (before My EE expires them).
+        self.maxSessionAge = maxSessionAge
+
+        # The logged in My EE object (only one thread uses it at a time).
+        self.myEE = None
+        self.loginTime = None
+        self.lastKeepAlive = None
+        self.lock = threading.RLock()
+
+        # How often the session was kept alive (and how often it had to be renewed).
+        self.statistics = {'logins':0, 'keepAlives':0, 'proactiveLogins':0, 'expiredSessions':0}
+
+    def login(self):
+        with self.lock:
+            # The first login may resume a cached session (later ones always log in again).
+            if self.myEE:
+                self.myEE.authenticate(self.email, self.password)
+
+                if self.sessionCache:
+                    with self.sessionCache.lock(self.email):
+                        self.sessionCache.save(self.email, self.myEE.exportSession())
+            else:
+                self.myEE = MyEE(self.email, self.password, self.sessionCache, self.rateLimiter, self.responseCache, self.instrumentation, self.transport)
+
+            self.loginTime = time.time()
+            self.statistics['logins'] += 1
+
+    def sessionAge(self):
+        return time.time() - self.loginTime if self.loginTime else None
+
+    def keepAlive(self):
+        with self.lock:
+            if not self.myEE:
+                self.login()
+            elif self.sessionAge() >= self.maxSessionAge:
+                # Log in again before the session gets old enough to expire part way through a job.
+                self.statistics['proactiveLogins'] += 1
+                self.login()
+            elif self.myEE.isSessionValid():
+                # The one lightweight request keeps the session from idling out.
+                self.statistics['keepAlives'] += 1
+            else:
+                self.statistics['expiredSessions'] += 1
+                self.login()
+
+            self.lastKeepAlive = time.time()
+
+    @contextlib.contextmanager
+    def use(self):
+        # Lends the logged in My EE object to a job.
+        with self.lock:
+            if not self.myEE or self.sessionAge() >= self.maxSessionAge:
+                self.keepAlive()
+
+            try:
+                yield self.myEE
+            except Exception:
+                # The session may have expired under the job, so the next job should not fail the same way.
+                if not self.myEE.isSessionValid():
+                    self.statistics['expiredSessions'] += 1
+                    self.login()
+                raise
+
+    def status(self):
+        sessionAge = self.sessionAge()
+        return {'loggedIn':self.myEE is not None, 'sessionAge':round(sessionAge, 3) if sessionAge is not None else None, 'lastKeepAlive':self.lastKeepAlive, 'currentMSISDN':self.myEE.currentMSISDN if self.myEE else None, 'statistics':dict(self.statistics)}